@@ -23,45 +23,50 @@ the basis of pseudocolor.py
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import sys
+import csv
 
 # Fixed metadata for the ColorBrewer color ramps
 author = 'Cynthia Brewer'
 comments = 'Colours from www.colorbrewer.org by Cynthia A. Brewer, Geography, Pennsylvania State University.'
 
 
-def readData(fname):
+def readData(fname, wantList=None):
     """
     Reads the data out of the CSV and makes it into
     a dictionary key on name, numcolours and type.
-    data is r,g,b tuple
+    data is r,g,b tuple. If wantList is given only
+    the palettes named in it are returned.
     """
-    count = 0
     lastName = None
     lastNumColors = None
     lastType = None
+    key = None
+    wanted = True
     infoDict = {}
 
-    for line in open(fname):
-        if count != 0:
-            arr = line.strip().split(',')
+    with open(fname, newline='') as csvfile:
+        # let the csv module do the splitting
+        reader = csv.reader(csvfile)
+        next(reader)  # skip header
+        for arr in reader:
             if ''.join(arr) == '':
                 break  # end of data
             (name, numColors, _, _, _, _, r, g, b, dtype) = arr
 
-            if name != '':
-                lastName = name
-            if numColors != '':
-                lastNumColors = numColors
-            if dtype != '':
-                lastType = dtype
+            # only build a new key when a new palette starts
+            if name != '' or numColors != '' or dtype != '':
+                if name != '':
+                    lastName = name
+                if numColors != '':
+                    lastNumColors = numColors
+                if dtype != '':
+                    lastType = dtype
+                key = '%s_%s_%s' % (lastName, lastNumColors, lastType)
+                wanted = wantList is None or lastName in wantList
 
-            key = '_'.join([lastName, lastNumColors, lastType])
-            if key in infoDict:
-                infoDict[key].append((r, g, b))
-            else:
-                infoDict[key] = [(r, g, b)]
+            if wanted:
+                infoDict.setdefault(key, []).append((r, g, b))
 
-        count += 1
     return infoDict
 
 
@@ -74,7 +79,7 @@ def findMaxColors(infoDict):
     for key in infoDict.keys():
         (name, colors, dtype) = key.split('_')
         colors = int(colors)
-        maxKey = '_'.join((name, dtype))
+        maxKey = '%s_%s' % (name, dtype)
         if maxKey in maxDict:
             if colors > maxDict[maxKey]:
                 maxDict[maxKey] = colors
@@ -84,7 +89,7 @@ def findMaxColors(infoDict):
     retDict = {}
     for key, colors in maxDict.items():
         (name, dtype) = key.split('_')
-        infoKey = '_'.join([name, str(colors), dtype])
+        infoKey = '%s_%d_%s' % (name, colors, dtype)
         data = infoDict[infoKey]
         retDict[key] = data
 
@@ -96,14 +101,8 @@ def emitPythonCode(infoDict):
     for key in sorted(infoDict.keys()):
         (name, dtype) = key.split('_')
         print("RAMP['%s'] = {'author': '%s', 'comments': '%s', 'type': '%s'}" % (name, author, comments, dtype))
-        # turn r,g,b tuples into list
-        redList = []
-        greenList = []
-        blueList = []
-        for (r, g, b) in infoDict[key]:
-            redList.append(r)
-            greenList.append(g)
-            blueList.append(b)
+        # split r,g,b tuples into a tuple per channel
+        (redList, greenList, blueList) = zip(*infoDict[key])
         redstr = ' '.join(redList)
         greenstr = ' '.join(greenList)
         bluestr = ' '.join(blueList)
@@ -114,6 +113,10 @@ def emitPythonCode(infoDict):
 
 
 if __name__ == '__main__':
-    info = readData(sys.argv[1])
+    # any extra arguments are the names of the palettes wanted
+    schemeNames = None
+    if len(sys.argv) > 2:
+        schemeNames = frozenset(sys.argv[2:])
+    info = readData(sys.argv[1], schemeNames)
     maxinfo = findMaxColors(info)
     emitPythonCode(maxinfo)
@@ -18,11 +18,11 @@ Contains the AddColumnDialog class
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+from PySide6.QtCore import Slot
 from PySide6.QtWidgets import QDialog, QFormLayout, QComboBox, QLineEdit
-from PySide6.QtWidgets import QPushButton, QHBoxLayout, QVBoxLayout, QMessageBox
+from PySide6.QtWidgets import QPushButton, QHBoxLayout, QVBoxLayout
 
 from .viewerRAT import NEWCOL_INT, NEWCOL_FLOAT, NEWCOL_STRING
-from .viewerstrings import MESSAGE_TITLE
 
 
 class AddColumnDialog(QDialog):
@@ -34,14 +34,14 @@ class AddColumnDialog(QDialog):
         QDialog.__init__(self, parent)
 
         self.typeCombo = QComboBox()
-        userdata = NEWCOL_INT
-        self.typeCombo.addItem("Integer", userdata)
-        userdata = NEWCOL_FLOAT
-        self.typeCombo.addItem("Floating Point", userdata)
-        userdata = NEWCOL_STRING
-        self.typeCombo.addItem("String", userdata)
+        # PySide stores the Python ints directly as the item data
+        self.typeCombo.addItem("Integer", NEWCOL_INT)
+        self.typeCombo.addItem("Floating Point", NEWCOL_FLOAT)
+        self.typeCombo.addItem("String", NEWCOL_STRING)
 
         self.nameEdit = QLineEdit()
+        # OK is only enabled once a name has been entered
+        self.nameEdit.textChanged.connect(self.onNameChanged)
 
         self.formLayout = QFormLayout()
         self.formLayout.addRow("Column Type", self.typeCombo)
@@ -49,7 +49,8 @@ class AddColumnDialog(QDialog):
 
         self.okButton = QPushButton()
         self.okButton.setText("OK")
-        self.okButton.clicked.connect(self.onOK)
+        self.okButton.setEnabled(False)
+        self.okButton.clicked.connect(self.accept)
 
         self.cancelButton = QPushButton()
         self.cancelButton.setText("Cancel")
@@ -65,19 +66,15 @@ class AddColumnDialog(QDialog):
         self.nameEdit.setFocus()
         self.setLayout(self.mainLayout)
 
-    def onOK(self):
-        if len(self.nameEdit.text()) == 0:
-            QMessageBox.critical(self, MESSAGE_TITLE, "Must enter column name")
-            self.nameEdit.setFocus()
-        else:
-            self.accept()
+    @Slot(str)
+    def onNameChanged(self, text):
+        "Only let them press OK if there is a column name"
+        self.okButton.setEnabled(len(text) > 0)
 
     def getColumnType(self):
-        index = self.typeCombo.currentIndex()
-        userdata = self.typeCombo.itemData(index)
-        return int(userdata)
+        return self.typeCombo.currentData()
 
     def getColumnName(self):
-        return str(self.nameEdit.text())
+        return self.nameEdit.text()
 
 
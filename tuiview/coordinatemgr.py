@@ -26,6 +26,9 @@ class CoordManager:
     base class for the layer's coordmgr instance. Derived separately
     for vector and raster layers.
     """
+    # these are used a lot so use slots for faster attribute access
+    __slots__ = ('dspWidth', 'dspHeight')
+
     def __init__(self):
         # The size of the display window, in display coords
         self.dspWidth = None
@@ -84,6 +87,8 @@ class VectorCoordManager(CoordManager):
     """
     Manages coords for a vector layer
     """
+    __slots__ = ('extent', 'fullExtent', 'metersperpix')
+
     def __init__(self):
         CoordManager.__init__(self)
         self.extent = None
@@ -181,8 +186,16 @@ class RasterCoordManager(CoordManager):
     In all cases, coordinate pairs are given with the horizontal coordinate first, 
     i.e. (x, y), even when referring to row/col pairs. Thus, a row/col pair
     will be given as (col, row). 
+
+    Apart from pixel2display() and world2display(), which return ints, 
+    the conversions can be given numpy arrays of coordinates and will
+    convert them all at once, which is much faster than a loop.
                          
     """
+    __slots__ = ('pixTop', 'pixLeft', 'pixBottom', 'pixRight', 
+        'imgPixPerWinPix', 'geotransform', 'geotransformDet', 
+        'noRotation', 'datasetSizeX', 'datasetSizeY')
+
     def __init__(self):
         CoordManager.__init__(self)
         # The raster row/col which is to live in the top-left 
@@ -198,6 +211,11 @@ class RasterCoordManager(CoordManager):
         # GDAL geotransform array, which defines relationship between
         # pixel and world coords
         self.geotransform = None
+        # worked out from the geotransform by setGeoTransformAndSize()
+        # so world2pixel() doesn't have to each time. The determinant
+        # and whether there is no rotation
+        self.geotransformDet = None
+        self.noRotation = False
         # size of the raster
         self.datasetSizeX = None
         self.datasetSizeY = None
@@ -224,6 +242,8 @@ class RasterCoordManager(CoordManager):
         Set the GDAL geotransform array and size
         """
         self.geotransform = transform
+        self.geotransformDet = transform[1] * transform[5] - transform[2] * transform[4]
+        self.noRotation = transform[2] == 0 and transform[4] == 0
         self.datasetSizeX = xsize
         self.datasetSizeY = ysize
     
@@ -333,10 +353,17 @@ class RasterCoordManager(CoordManager):
         """
         gt = self.geotransform
 
-        # Classic 2x2 matrix inversion
-        det = gt[1] * gt[5] - gt[2] * gt[4]
-        col = (gt[5] * (x - gt[0]) - gt[2] * (y - gt[3])) / det
-        row = (-gt[4] * (x - gt[0]) + gt[1] * (y - gt[3])) / det
+        dx = x - gt[0]
+        dy = y - gt[3]
+        if self.noRotation:
+            # no rotation so the inversion is just a scale
+            col = dx / gt[1]
+            row = dy / gt[5]
+        else:
+            # Classic 2x2 matrix inversion
+            det = self.geotransformDet
+            col = (gt[5] * dx - gt[2] * dy) / det
+            row = (-gt[4] * dx + gt[1] * dy) / det
         return (col, row)
         
     def display2world(self, dspX, dspY):
@@ -344,8 +371,13 @@ class RasterCoordManager(CoordManager):
         Convert display (x, y) to world coordinates. Returns
         a tuple of floats (x, y), in the world coordinate system
         """
-        (col, row) = self.display2pixel(dspX, dspY)
-        (wldX, wldY) = self.pixel2world(col, row)
+        # display2pixel() then pixel2world() done inline as this is 
+        # called a lot. Same order of operations so same result.
+        gt = self.geotransform
+        col = self.pixLeft + dspX * self.imgPixPerWinPix
+        row = self.pixTop + dspY * self.imgPixPerWinPix
+        wldX = gt[0] + col * gt[1] + row * gt[2]
+        wldY = gt[3] + col * gt[4] + row * gt[5]
         return (wldX, wldY)
     
     def world2display(self, wldX, wldY):
@@ -354,7 +386,9 @@ class RasterCoordManager(CoordManager):
         a tuple of int values (x, y) in display coordinate system
         """
         (col, row) = self.world2pixel(wldX, wldY)
-        (dspX, dspY) = self.pixel2display(col, row)
+        # pixel2display() done inline
+        dspX = int((col - self.pixLeft) / self.imgPixPerWinPix)
+        dspY = int((row - self.pixTop) / self.imgPixPerWinPix)
         return (dspX, dspY)
 
     def getWorldExtent(self):
@@ -21,7 +21,8 @@ Contains the GeolinkedViewers class.
 
 import math
 import json
-from PySide6.QtCore import QObject, QTimer, Qt, QEventLoop, Signal
+import functools
+from PySide6.QtCore import QObject, QTimer, Qt, QEventLoop, Signal, Slot
 from PySide6.QtWidgets import QApplication
 
 from . import viewerwindow
@@ -30,6 +31,14 @@ from .querywindow import QueryDockWidget
 from .viewerlayers import ViewerQueryPointLayer, ViewerFeatureVectorLayer
 from . import viewerwidget
 
+# geolink moves and query points that arrive within this many ms
+# of each other are merged and only the last one is passed on.
+# So the other viewers get them asynchronously, up to this long after
+# they were sent, and a pending move is always passed on before a pending
+# query point whatever order they arrived in. Code that needs them
+# to have arrived (or in a particular order) should call flushGeolink()
+GEOLINK_COALESCE_MS = 16
+
 
 class GeolinkedViewers(QObject):
     """
@@ -46,6 +55,9 @@ class GeolinkedViewers(QObject):
         # need to keep a reference to keep the python objects alive
         # otherwise they are deleted before they are shown
         self.viewers = []
+        # the same viewers keyed on the id() of their viewwidget
+        # which is the senderid in a GeolinkInfo
+        self.viewersById = {}
 
         # load plugins if asked
         if loadPlugins:
@@ -57,13 +69,18 @@ class GeolinkedViewers(QObject):
         else:
             self.pluginmanager = None
 
-        # set up a timer so we can periodically remove viewer
-        # instances when they are no longer open to save memory
-        # Usually, in PyQt you don't have such a 'dynamic' 
-        # number of sub windows. 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.cleanUp)
-        self.timer.start(10000)  # 10 secs
+        # the latest geolink move and query point from the viewers
+        # that haven't been passed on yet. See queueMove() and queueQuery()
+        self.pendingMove = None
+        self.pendingQuery = None
+        self.geolinkTimer = QTimer(self)
+        self.geolinkTimer.setSingleShot(True)
+        self.geolinkTimer.setInterval(GEOLINK_COALESCE_MS)
+        self.geolinkTimer.timeout.connect(self.flushGeolink)
+
+        # viewers are deleted by Qt when they are closed and 
+        # removed from self.viewers by onViewerDestroyed() so we
+        # don't need to poll for closed windows
 
     @staticmethod
     def getViewerList(screen=None):
@@ -72,29 +89,33 @@ class GeolinkedViewers(QObject):
         Pass in a screen to restrict to the viewers on
         that screen
         """
-        viewers = []
-        for viewer in QApplication.topLevelWidgets():
-            if (isinstance(viewer, viewerwindow.ViewerWindow) and
-                    viewer.isVisible()):
-                if screen is not None:
-                    winHandle = viewer.windowHandle()
-                    screen2 = winHandle.screen()
-                    if screen2 is not None and screen.name() != screen2.name():
-                        continue
-                    
-                viewers.append(viewer)
-        return viewers
+        ViewerWindow = viewerwindow.ViewerWindow
+        viewers = [viewer for viewer in QApplication.topLevelWidgets()
+            if isinstance(viewer, ViewerWindow) and viewer.isVisible()]
+
+        if screen is not None:
+            screenName = screen.name()
+            onScreen = []
+            for viewer in viewers:
+                screen2 = viewer.windowHandle().screen()
+                if screen2 is None or screen2.name() == screenName:
+                    onScreen.append(viewer)
+            viewers = onScreen
 
-    def cleanUp(self):
-        "remove any viewers that are no longer in the activelist"
-        activeviewers = self.getViewerList()
+        return viewers
 
-        # remove any viewers that are no longer in the activelist
-        # (they must have been closed)
-        # they should now be cleaned up by Python and memory released
-        self.viewers = [viewer for viewer in self.viewers 
-            if viewer in activeviewers]
+    def onViewerDestroyed(self, widgetId, obj=None):
+        """
+        Called when a viewer has been closed and deleted by Qt.
+        Remove our reference to it so Python can release the memory.
+        widgetId is the id() of the viewer's viewwidget since the 
+        object itself is no longer usable by the time this is called.
+        """
+        viewer = self.viewersById.pop(widgetId, None)
+        if viewer is not None:
+            self.viewers.remove(viewer)
 
+    @Slot()
     def closeAll(self):
         """
         Call this to close all geolinked viewers
@@ -102,6 +123,7 @@ class GeolinkedViewers(QObject):
         for viewer in self.viewers:
             viewer.close()
         self.viewers = []
+        self.viewersById = {}
 
     def setActiveToolAll(self, tool, senderid):
         """
@@ -131,6 +153,8 @@ class GeolinkedViewers(QObject):
         """
         Call this to create a new geolinked viewer.
         Returns the created ViewerWindow instance.
+        This is the only place viewers are created so they
+        all get the same signals, plugin calls etc.
         """
         newviewer = viewerwindow.ViewerWindow()
         newviewer.show()
@@ -143,6 +167,7 @@ class GeolinkedViewers(QObject):
             newviewer.addRasterInternal(filename, stretch)
 
         self.viewers.append(newviewer)
+        self.viewersById[id(newviewer.viewwidget)] = newviewer
 
         # call any plugins
         if self.pluginmanager is not None:
@@ -159,12 +184,18 @@ class GeolinkedViewers(QObject):
         """
         Connects the appropriate signals for the new viewer
         """
+        # have Qt delete the viewer when it is closed and tell us
+        # so we can drop our reference
+        newviewer.setAttribute(Qt.WA_DeleteOnClose)
+        newviewer.destroyed.connect(
+            functools.partial(self.onViewerDestroyed, 
+                id(newviewer.viewwidget)))
         # connect to the signal the widget sends when moved
         # sends new easting, northing and id() of the widget. 
-        newviewer.viewwidget.geolinkMove.connect(self.onMove)
+        newviewer.viewwidget.geolinkMove.connect(self.queueMove)
         # the signal when a new query point is chosen
         # on a widget. Sends easting, northing and id() of the widget
-        newviewer.viewwidget.geolinkQueryPoint.connect(self.onQuery)
+        newviewer.viewwidget.geolinkQueryPoint.connect(self.queueQuery)
         # signal for request for new window
         newviewer.newWindowSig.connect(self.onNewWindow)
         # signal for request for windows to be tiled
@@ -178,28 +209,14 @@ class GeolinkedViewers(QObject):
         # signal for request to read viewers state from file
         newviewer.readViewersState.connect(self.readViewersState)
 
+    @Slot()
     def onNewWindow(self):
         """
         Called when the user requests a new window
         """
-        newviewer = viewerwindow.ViewerWindow()
-        newviewer.show()
-
-        # connect signals
-        self.connectSignals(newviewer)
-
-        self.viewers.append(newviewer)
-
-        # call any plugins
-        if self.pluginmanager is not None:
-            self.pluginmanager.callAction(
-                pluginmanager.PLUGIN_ACTION_NEWVIEWER, newviewer)
-
-        # emit a signal so that application can do any customisation
-        self.newViewerCreated.emit(newviewer)
-
-        return newviewer
+        return self.newViewer()
 
+    @Slot(QueryDockWidget)
     def onNewQueryWindow(self, querywindow):
         """
         Called when the viewer starts a new query window
@@ -216,10 +233,12 @@ class GeolinkedViewers(QObject):
         if overridden, return a QRect
         """
         if screen is None:
-            return QApplication.desktop().availableGeometry()
-        else:
-            return screen.availableGeometry()
+            # QApplication.desktop() is gone in Qt6
+            screen = QApplication.primaryScreen()
+        # QScreen keeps this up to date itself so no need to cache it
+        return screen.availableGeometry()
 
+    @Slot(int, int, object)
     def onTileWindows(self, nxside, nyside, screen):
         """
         Called when the user wants the windows to be tiled
@@ -228,21 +247,26 @@ class GeolinkedViewers(QObject):
         desktop = self.getDesktopSize(screen)
         # getViewerList returns a temporary list so we can stuff around with it
         viewerList = self.getViewerList(screen)
+        nviewers = len(viewerList)
+        if nviewers == 0:
+            return
 
         # do they want full auto?
+        # all integer maths - -(-a // b) is a rounded up a / b
         if nxside == 0 and nyside == 0:
             # find the number of viewers along each side
-            nxside = math.sqrt(len(self.viewers))
+            nxside = math.isqrt(nviewers)
             # round up - we may end up with gaps
-            nxside = int(math.ceil(nxside))
+            if nxside * nxside < nviewers:
+                nxside += 1
             
-            nyside = int(math.ceil(len(self.viewers) / float(nxside)))
+            nyside = -(-nviewers // nxside)
         elif nxside == 0 and nyside != 0:
             # guess nxside
-            nxside = int(math.ceil(len(self.viewers) / float(nyside)))
+            nxside = -(-nviewers // nyside)
         elif nxside != 0 and nyside == 0:
             # guess yxside
-            nyside = int(math.ceil(len(self.viewers) / float(nxside)))
+            nyside = -(-nviewers // nxside)
 
         # size of each viewer window
         viewerwidth = int(desktop.width() / nxside)
@@ -251,75 +275,150 @@ class GeolinkedViewers(QObject):
         # there is a problem where resize() doesn't include the frame
         # area so we have to calculate it ourselves. This is the best
         # I could come up with
-        geom = self.viewers[0].geometry()
-        framegeom = self.viewers[0].frameGeometry()
-        framewidth = framegeom.width() - geom.width()
-        frameheight = framegeom.height() - geom.height()
+        geom = viewerList[0].geometry()
+        framegeom = viewerList[0].frameGeometry()
+        # resize takes the area without the frame so we correct for that
+        targetwidth = viewerwidth - (framegeom.width() - geom.width())
+        targetheight = viewerheight - (framegeom.height() - geom.height())
+
+        # the location of each column and row of the grid
+        # remember that taskbar etc mean that we might not want 
+        # to start at 0,0
+        basex = desktop.x()
+        basey = desktop.y()
+        xlocs = [basex + viewerwidth * xcount for xcount in range(nxside)]
+        # may need more rows than nyside if they asked for too few
+        nrows = -(-nviewers // nxside)
+        ylocs = [basey + viewerheight * ycount for ycount in range(nrows)]
+        maximized = Qt.WindowMaximized
 
         # now resize and move the viewers
-        xcount = 0
-        ycount = 0
-        while len(viewerList) > 0:
+        for idx in range(nviewers):
             # work out the location we will use and find the viewer closest
-            xloc = desktop.x() + viewerwidth * xcount
-            yloc = desktop.y() + viewerheight * ycount
-
-            def viewerKey(a):
-                xdist = abs(a.x() - xloc)
-                ydist = abs(a.y() - yloc)
-                return math.sqrt(xdist * xdist + ydist * ydist)
-
-            # sort by distance from this location
-            viewerList = sorted(viewerList, key=viewerKey)
+            ycount, xcount = divmod(idx, nxside)
+            xloc = xlocs[xcount]
+            yloc = ylocs[ycount]
+
+            def viewerKey(a, xloc=xloc, yloc=yloc):
+                xdist = a.x() - xloc
+                ydist = a.y() - yloc
+                return xdist * xdist + ydist * ydist
+
+            # sort by distance from this location. Keep the sorted
+            # order as viewers at the same distance (ie new windows
+            # at the default position) are then taken in the order
+            # of the previous sort
+            viewerList.sort(key=viewerKey)
             # closest
             viewer = viewerList.pop(0)
 
             # remove any maximised states - window manager will not let
             # use resize
             state = viewer.windowState()
-            if (state & Qt.WindowMaximized) == Qt.WindowMaximized:
-                viewer.setWindowState(state ^ Qt.WindowMaximized)
-            # resize takes the area without the frame so we correct for that
-            viewer.resize(viewerwidth - framewidth, viewerheight - frameheight)
-            # remember that taskbar etc mean that we might not want 
-            # to start at 0,0
+            if (state & maximized) == maximized:
+                viewer.setWindowState(state ^ maximized)
+            # don't paint at the old position with the new size.
+            # Note: not setGeometry() - that places the client area
+            # whereas move() places the frame
+            viewer.setUpdatesEnabled(False)
+            viewer.resize(targetwidth, targetheight)
             viewer.move(xloc, yloc)
+            viewer.setUpdatesEnabled(True)
+
+    @Slot(viewerwidget.GeolinkInfo)
+    def queueMove(self, obj):
+        """
+        Called when a widget signals it has moved. Rather than moving
+        the other widgets straight away, wait GEOLINK_COALESCE_MS 
+        so a fast pan only redraws them for the latest position.
+        """
+        if len(self.viewersById) < 2:
+            # only the sender - no one else to tell
+            return
+        self.pendingMove = obj
+        if not self.geolinkTimer.isActive():
+            self.geolinkTimer.start()
+
+    @Slot(viewerwidget.GeolinkInfo)
+    def queueQuery(self, obj):
+        """
+        Called when a widget signals the query point has moved.
+        As for queueMove() only the latest one is passed on.
+        """
+        if len(self.viewersById) < 2:
+            # only the sender - no one else to tell
+            return
+        self.pendingQuery = obj
+        if not self.geolinkTimer.isActive():
+            self.geolinkTimer.start()
+
+    @Slot()
+    def flushGeolink(self):
+        """
+        Called by the timer started by queueMove() and queueQuery().
+        Passes on the latest move and query point to the other widgets.
+        Can also be called directly to pass on anything pending now.
+        """
+        obj = self.pendingMove
+        if obj is not None:
+            self.pendingMove = None
+            self.onMove(obj)
 
-            xcount += 1
-            if xcount >= nxside:
-                xcount = 0
-                ycount += 1
+        obj = self.pendingQuery
+        if obj is not None:
+            self.pendingQuery = None
+            self.onQuery(obj)
 
+    @Slot(viewerwidget.GeolinkInfo)
     def onMove(self, obj):
         """
         Called when a widget signals it has moved. Move all the
         other widgets. A GeolinkInfo object is passed.
         Sends the id() of the widget and uses this to not move the original widget
         """
+        senderid = obj.senderid
+
         # paint any windows that are ready
         QApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
-        for viewer in self.getViewerList():
+        # self.viewersById is kept up to date by onViewerDestroyed()
+        # so we don't need to ask Qt for the top level widgets.
+        # Take a copy of the ids as processEvents() below could close
+        # (and so delete) a viewer - look each one up again
+        for widgetid in list(self.viewersById.keys()):
+            viewer = self.viewersById.get(widgetid)
+            if viewer is None:
+                # closed since we started
+                continue
             # we use the id() of the widget to 
             # identify them.
-            if id(viewer.viewwidget) != obj.senderid:
-                viewer.viewwidget.doGeolinkMove(obj.easting, obj.northing, 
-                                    obj.metresperwinpix)
+            if widgetid != senderid and viewer.isVisible():
+                # minimized viewers put this off until they are restored
+                viewer.doGeolinkMove(obj)
 
             # paint any windows that are ready
             QApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
 
+    @Slot(viewerwidget.GeolinkInfo)
     def onQuery(self, obj):
         """
         Called when a widget signals the query point has moved.
         Notify the other widgets. A GeolinkInfo object is passed.
         Sends the id() of the widget and uses this not to notify the original widget
         """
-        for viewer in self.getViewerList():
+        senderid = obj.senderid
+        easting = obj.easting
+        northing = obj.northing
+        # as for onMove() a viewer could be closed while we go
+        for widgetid in list(self.viewersById.keys()):
+            viewer = self.viewersById.get(widgetid)
+            if viewer is None:
+                continue
             # we use the id() of the widget to 
             # identify them.
-            if id(viewer.viewwidget) != obj.senderid:
-                viewer.viewwidget.doGeolinkQueryPoint(obj.easting, obj.northing)
+            if widgetid != senderid and viewer.isVisible():
+                viewer.viewwidget.doGeolinkQueryPoint(easting, northing)
 
+    @Slot(object)
     def writeViewersState(self, fileobj):
         """
         Gets the state of all the viewers (location, layers etc) as a json encoded
@@ -379,6 +478,7 @@ class GeolinkedViewers(QObject):
             # now get the layers to write themselves out
             viewer.viewwidget.layers.toFile(fileobj)
 
+    @Slot(object)
     def readViewersState(self, fileobj):
         """
         Reads viewer state from the fileobj and restores viewers 
@@ -441,6 +541,13 @@ class GeolinkedViewers(QObject):
         if qeasting is not None:
             query_viewer.viewwidget.newQueryPoint(qeasting, qnorthing)
 
+        # pass on the query point (and anything else pending) now
+        # so it arrives before the move below rather than after it
+        self.flushGeolink()
+
         # set the location if any
         if geolink is not None:
             self.onMove(geolink)
+
+        # and anything that came in while doing that
+        self.flushGeolink()
@@ -34,16 +34,24 @@ class LayerItemModel(QAbstractListModel):
     This class provides the data to the list view by 
     reading the list of layers provided by the LayerManager
     """
+    # shared between all instances. Created on first use
+    # as a QIcon can't be created before the QApplication
+    rasterIcon = None
+    vectorIcon = None
+
     def __init__(self, viewwidget, viewwindow, parent):
         QAbstractListModel.__init__(self, parent)
         self.viewwidget = viewwidget
         self.viewwindow = viewwindow
-        self.rasterIcon = QIcon(":/viewer/images/rasterlayer.png")
-        self.vectorIcon = QIcon(":/viewer/images/vectorlayer.png")
+        # the LayerManager lives as long as the viewwidget
+        self.layers = viewwidget.layers
+        if LayerItemModel.rasterIcon is None:
+            LayerItemModel.rasterIcon = QIcon(":/viewer/images/rasterlayer.png")
+            LayerItemModel.vectorIcon = QIcon(":/viewer/images/vectorlayer.png")
 
     def rowCount(self, parent):
         "Just the number of layers"
-        return len(self.viewwidget.layers.layers)
+        return len(self.layers.layers)
 
     def flags(self, index):
         "Have to override to make it checkable"
@@ -56,9 +64,7 @@ class LayerItemModel(QAbstractListModel):
         order (last layer is top) we have a helper function
         to get the right layer
         """
-        row = index.row()
-        layerNum = len(self.viewwidget.layers.layers) - row - 1
-        return self.viewwidget.layers.layers[layerNum]
+        return self.layers.layers[-index.row() - 1]
 
     def data(self, index, role):
         """
@@ -70,11 +76,10 @@ class LayerItemModel(QAbstractListModel):
         layer = self.getLayer(index)
 
         if role == Qt.DisplayRole:
-            # name 
+            # name - basename of the file, set when the layer was opened
             return layer.title
         elif role == Qt.DecorationRole:
             # icon
-            layer = self.getLayer(index)
             if isinstance(layer, viewerlayers.ViewerRasterLayer):
                 return self.rasterIcon
             else:
@@ -96,7 +101,7 @@ class LayerItemModel(QAbstractListModel):
             state = value
             layer = self.getLayer(index)
             state = Qt.CheckState(state) == Qt.Checked
-            self.viewwidget.layers.setDisplayedState(layer, state)
+            self.layers.setDisplayedState(layer, state)
 
             # redraw
             self.viewwidget.viewport().update()
@@ -476,8 +481,8 @@ class LayerWindow(QDockWidget):
         self.listView = LayerListView()
 
         # set our item model
-        model = LayerItemModel(viewwidget, parent, self)
-        self.listView.setModel(model)
+        self.model = LayerItemModel(viewwidget, parent, self)
+        self.listView.setModel(self.model)
 
         self.setWidget(self.listView)
 
@@ -488,10 +493,10 @@ class LayerWindow(QDockWidget):
         """
         Called when a layer has been added or removed to/from the LayerManager
         """
-        # the only way I can get the whole thing redrawn
-        # is to pretend I have a new model. Any suggestions?
-        model = LayerItemModel(self.viewwidget, self.parent, self)
-        self.listView.setModel(model)
+        # tell the view that everything has changed so it
+        # asks the model for all the rows again
+        self.model.beginResetModel()
+        self.model.endResetModel()
 
     def closeEvent(self, event):
         """
@@ -1520,7 +1520,7 @@ Use the special columns:
             tables = ViewerLUT.readSurrogateColorTables(gdaldataset)
             if len(tables) == 0:
                 msg = "File has no surrogate color tables\n"
-                msg = msg + "Use viewerwritetable to insert some"
+                msg = msg + "Use tuiviewwritetable to insert some"
                 QMessageBox.critical(self, MESSAGE_TITLE, msg)
                 return
 
@@ -506,17 +506,83 @@ class ViewerLUT(QObject):
         # need to convert everything to json combatibale format
         jsondict = {}
         for name in tables:
-            rgbadict = {}
-            alllut = tables[name]
-            for code in RGBA_CODES:
-                lutindex = CODE_TO_LUTINDEX[code]
-                jsonlutstring = alllut[..., lutindex].tolist()
-                lutstring = json.dumps(jsonlutstring)
-                rgbadict[code] = lutstring
-            jsondict[name] = rgbadict
+            jsondict[name] = ViewerLUT.surrogateColorTableToJSON(tables[name])
         jsonstring = json.dumps(jsondict)
         gdaldataset.SetMetadataItem(VIEWER_SURROGATE_CT_KEY, jsonstring)
 
+    @staticmethod
+    def surrogateColorTableToJSON(alllut):
+        """
+        Convert a single (N, 4) surrogate color table into the
+        dictionary of json strings keyed on the rgba code that
+        is stored in the metadata.
+        """
+        rgbadict = {}
+        for code in RGBA_CODES:
+            lutindex = CODE_TO_LUTINDEX[code]
+            jsonlutstring = alllut[..., lutindex].tolist()
+            rgbadict[code] = json.dumps(jsonlutstring)
+        return rgbadict
+
+    @staticmethod
+    def upsertSurrogateColorTables(gdaldataset, tables):
+        """
+        Add (or replace) the given dictionary of surrogate color
+        tables in the file's metadata. Unlike readSurrogateColorTables
+        followed by writeSurrogateColorTables the existing tables are
+        left as json strings and not decoded and re-encoded.
+        """
+        jsondict = ViewerLUT.readSurrogateColorTablesJSON(gdaldataset)
+
+        for name in tables:
+            jsondict[name] = ViewerLUT.surrogateColorTableToJSON(tables[name])
+
+        jsonstring = json.dumps(jsondict)
+        gdaldataset.SetMetadataItem(VIEWER_SURROGATE_CT_KEY, jsonstring)
+
+    @staticmethod
+    def upsertSurrogateColorTable(gdaldataset, name, alllut):
+        """
+        Add (or replace) a single named surrogate color table
+        in the file's metadata.
+        """
+        ViewerLUT.upsertSurrogateColorTables(gdaldataset, {name: alllut})
+
+    @staticmethod
+    def removeSurrogateColorTables(gdaldataset, names):
+        """
+        Remove the named surrogate color tables from the file's
+        metadata. The remaining tables are left as json strings and
+        not decoded and re-encoded. Raises InvalidColorTable (before
+        anything is written) if any of the names can't be found.
+        """
+        jsondict = ViewerLUT.readSurrogateColorTablesJSON(gdaldataset)
+
+        for name in names:
+            if name not in jsondict:
+                msg = "Can't find table %s" % name
+                raise viewererrors.InvalidColorTable(msg)
+            del jsondict[name]
+
+        jsonstring = json.dumps(jsondict)
+        gdaldataset.SetMetadataItem(VIEWER_SURROGATE_CT_KEY, jsonstring)
+
+    @staticmethod
+    def readSurrogateColorTablesJSON(gdaldataset):
+        """
+        Read the surrogate color tables stored in the file's 
+        metadata into a dictionary keyed on the name, but leave
+        each table as the dictionary of json strings keyed on the
+        rgba code that is stored. Much cheaper than 
+        readSurrogateColorTables when the tables aren't needed 
+        as arrays.
+        """
+        jsondict = {}
+        surrogatestring = gdaldataset.GetMetadataItem(VIEWER_SURROGATE_CT_KEY)
+        if surrogatestring is not None and surrogatestring != '':
+            jsondict = json.loads(surrogatestring)
+        return jsondict
+
     def loadColorTable(self, rat, nodata_rgba, background_rgba, nan_rgba):
         """
         Creates a LUT for a single band using 
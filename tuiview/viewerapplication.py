@@ -341,6 +341,9 @@ class ViewerApplication(QApplication):
             metresperimgpix = float(metresperimgpix)
 
             obj = GeolinkInfo(0, easting, northing, metresperimgpix)
+            # pass on any moves still waiting first so they
+            # don't undo this one
+            self.viewers.flushGeolink()
             self.viewers.onMove(obj)                
 
     def savePluginHandler(self, handler):
@@ -1585,6 +1585,10 @@ class LayerManager(QObject):
         self.fullextent = None
         self.queryPointLayer = ViewerQueryPointLayer()
         self.topLayer = None
+        # top most raster and vector layers. Updated by
+        # recalcTopLayers() whenever self.layers changes
+        self.topRasterLayer = None
+        self.topVectorLayer = None
 
         if NUM_GETIMAGE_THREADS > 1:
             # thread of the jobs
@@ -1614,6 +1618,22 @@ class LayerManager(QObject):
             self.topLayer = newTopLayer
             self.topLayerChanged.emit(self.topLayer)
 
+    def recalcTopLayers(self):
+        """
+        Find the top most raster and vector layers. Call this 
+        when the list of layers has been changed.
+        """
+        self.topRasterLayer = None
+        self.topVectorLayer = None
+        for layer in reversed(self.layers):
+            if self.topRasterLayer is None and isinstance(layer, ViewerRasterLayer):
+                self.topRasterLayer = layer
+            elif (self.topVectorLayer is None and 
+                    isinstance(layer, ViewerVectorLayer)):
+                self.topVectorLayer = layer
+            if self.topRasterLayer is not None and self.topVectorLayer is not None:
+                break
+
     def getFullExtent(self):
         """
         Return the full extent for all the open layers
@@ -1739,6 +1759,7 @@ class LayerManager(QObject):
         """
         layer.getImage()
         self.layers.append(layer)
+        self.recalcTopLayers()
 
         self.recalcFullExtent()
         self.layersChanged.emit()
@@ -1750,6 +1771,7 @@ class LayerManager(QObject):
         """
         if len(self.layers) > 0:
             self.layers.pop()
+            self.recalcTopLayers()
             self.recalcFullExtent()
             self.layersChanged.emit()
         self.updateTopFilename()
@@ -1759,6 +1781,7 @@ class LayerManager(QObject):
         Remove the specified layer
         """
         self.layers.remove(layer)
+        self.recalcTopLayers()
         self.recalcFullExtent()
         self.layersChanged.emit()
         self.updateTopFilename()
@@ -1772,6 +1795,7 @@ class LayerManager(QObject):
         if index < len(self.layers) - 1:
             self.layers.pop(index)
             self.layers.insert(index + 1, layer)
+            self.recalcTopLayers()
             self.layersChanged.emit()
         self.updateTopFilename()
 
@@ -1784,6 +1808,7 @@ class LayerManager(QObject):
         if index > 0:
             self.layers.pop(index)
             self.layers.insert(index - 1, layer)
+            self.recalcTopLayers()
             self.layersChanged.emit()
         self.updateTopFilename()
 
@@ -1796,6 +1821,7 @@ class LayerManager(QObject):
         if index < len(self.layers) - 1:
             self.layers.pop(index)
             self.layers.append(layer)
+            self.recalcTopLayers()
             self.layersChanged.emit()
         self.updateTopFilename()
 
@@ -1876,12 +1902,7 @@ class LayerManager(QObject):
         Returns the top most raster layer
         (if there is one) otherwise None
         """
-        rasterLayer = None
-        for layer in reversed(self.layers):
-            if isinstance(layer, ViewerRasterLayer):
-                rasterLayer = layer
-                break
-        return rasterLayer
+        return self.topRasterLayer
 
     def getTopDisplayedRasterLayer(self):
         """
@@ -1909,12 +1930,7 @@ class LayerManager(QObject):
         Returns the top most vector layer
         (if there is one) otherwise None
         """
-        vectorLayer = None
-        for layer in reversed(self.layers):
-            if isinstance(layer, ViewerVectorLayer):
-                vectorLayer = layer
-                break
-        return vectorLayer
+        return self.topVectorLayer
 
     def getTopDisplayedVectorLayer(self):
         """
@@ -2034,6 +2050,7 @@ class LayerManager(QObject):
             else:
                 raise ValueError('unsupported layer type')
 
+        self.recalcTopLayers()
         self.layersChanged.emit()
         self.updateTopFilename()
 
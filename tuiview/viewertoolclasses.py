@@ -41,14 +41,36 @@ class ToolInfo:
     def getInputModifiers(self):
         return self.modifiers
 
+    def getDisplayVertices(self):
+        """
+        Return the vertices of the poly as a tuple of 
+        numpy arrays (x, y) in display coords
+        """
+        # copy all the vertices
+        size = len(self.poly)
+        xDsp = numpy.empty((size,), dtype=float)
+        yDsp = numpy.empty((size,), dtype=float)
+        for idx, p in enumerate(self.poly):
+            xDsp[idx] = p.x()
+            yDsp[idx] = p.y()
+        return xDsp, yDsp
+
+    def getWorldVertices(self):
+        """
+        Return the vertices of the poly as a tuple of 
+        numpy arrays (x, y) in world coords. The coordmgr
+        converts them all in one go.
+        """
+        xDsp, yDsp = self.getDisplayVertices()
+        return self.layer.coordmgr.display2world(xDsp, yDsp)
+
     def getWorldPolygon(self):
         """
         Return a polygon of world coords
         """
-        wldList = []
-        for pt in self.poly:
-            wldx, wldy = self.layer.coordmgr.display2world(pt.x(), pt.y())
-            wldList.append(QPointF(wldx, wldy))
+        xWld, yWld = self.getWorldVertices()
+        wldList = [QPointF(wldx, wldy) 
+                for wldx, wldy in zip(xWld.tolist(), yWld.tolist())]
 
         return QPolygonF(wldList)
 
@@ -98,15 +120,8 @@ class PolygonToolInfo(ToolInfo):
         the data (would probably pay to apply getDisplayValidMask
         to the result)
         """
-        # copy all the vertices so they can be used to fill in poly
-        size = len(self.poly)
-        xDsp = numpy.empty((size,), dtype=float)
-        yDsp = numpy.empty((size,), dtype=float)
-        for idx, p in enumerate(self.poly):
-            xDsp[idx] = p.x()
-            yDsp[idx] = p.y()
-            
-        xWld, yWld = self.layer.coordmgr.display2world(xDsp, yDsp)
+        # get all the vertices so they can be used to fill in poly
+        xWld, yWld = self.getWorldVertices()
         minY = yWld.min()
         maxY = yWld.max()
 
@@ -126,8 +141,8 @@ class PolygonToolInfo(ToolInfo):
         """
         # Create ring
         ring = ogr.Geometry(ogr.wkbLinearRing)
-        for pt in self.poly:
-            wldx, wldy = self.layer.coordmgr.display2world(pt.x(), pt.y())
+        xWld, yWld = self.getWorldVertices()
+        for wldx, wldy in zip(xWld.tolist(), yWld.tolist()):
             ring.AddPoint(wldx, wldy)
 
         poly = ogr.Geometry(ogr.wkbPolygon)
@@ -205,8 +220,8 @@ class PolylineToolInfo(ToolInfo):
         Return a ogr.Geometry instance
         """
         geom = ogr.Geometry(ogr.wkbLineString)
-        for pt in self.poly:
-            wldx, wldy = self.layer.coordmgr.display2world(pt.x(), pt.y())
+        xWld, yWld = self.getWorldVertices()
+        for wldx, wldy in zip(xWld.tolist(), yWld.tolist()):
             geom.AddPoint(wldx, wldy)
         return geom
 
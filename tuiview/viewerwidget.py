@@ -59,6 +59,9 @@ class GeolinkInfo:
     Container class for the information passed in the geolinkMove
     and geolinkQueryPoint signals.
     """
+    # one of these is created for every move so keep it small
+    __slots__ = ('senderid', 'easting', 'northing', 'metresperwinpix')
+
     def __init__(self, senderid, easting, northing, metresperwinpix=0):
         self.senderid = senderid
         self.easting = easting
@@ -22,14 +22,16 @@ the ViewerWidget, menus, toolbars and status bars.
 
 import os
 import sys
+import copy
 import glob
+import platform
 import traceback
 from PySide6.QtWidgets import QMainWindow, QFileDialog, QDialog
 from PySide6.QtWidgets import QMessageBox, QProgressBar, QToolButton
 from PySide6.QtWidgets import QMenu, QLineEdit, QPushButton, QInputDialog
 from PySide6.QtGui import QIcon, QColor, QImage, QAction, QGuiApplication
 from PySide6.QtCore import QSettings, QSize, QPoint, Signal, Qt
-from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer
+from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer, QEvent
 from PySide6 import __version__ as PYSIDE_VERSION_STR
 from PySide6.QtCore import __version__ as QT_VERSION_STR
 from numpy import version as numpyVersion
@@ -81,6 +83,17 @@ NON_GDAL_FILTERS = {'BIL': 'ENVI BIL (*.bil)',
                     'BSQ': 'ENVI BSQ (*.bsq)',
                     'DEM': 'ENVI DEM (*.dem)',
                     'RAW': 'ENVI RAW (*.raw)'}
+# just the filter strings so they can be added to GDAL_FILTERS in one go
+NON_GDAL_FILTER_LIST = tuple(NON_GDAL_FILTERS.values())
+
+# Contents of the world file written by saveCurrentViewInternal.
+# See http://en.wikipedia.org/wiki/World_file
+# %f only gives 6 decimal places which isn't enough for 
+# high resolution imagery in geographic coordinates.
+WORLD_FILE_FORMAT = "%.10f\n0.0\n0.0\n%.10f\n%.10f\n%.10f\n"
+
+# buffer size used when reading and writing the viewers state files
+STATE_FILE_BUFFER_SIZE = 1024 * 1024
 
 GTIFF_CREATION_OPTIONS = os.getenv('TUIVIEW_DFLT_CREOPT_GTIFF')
 if GTIFF_CREATION_OPTIONS is None:
@@ -91,23 +104,116 @@ else:
     GTIFF_CREATION_OPTIONS = GTIFF_CREATION_OPTIONS.split(',')
 
 
+# The bulk of the actions for ViewerWindow. Each entry is:
+# (attribute, text, status tip, shortcut, icon, slot name, checkable, is tool)
+# Checkable actions are connected to the 'toggled' signal of the action, 
+# others to 'triggered'. Tools are added to ViewerWindow.toolActions
+# so they can be reset together.
+ACTION_SPECS = (
+    ('addRasterAct', "&Add Raster", "Open a GDAL supported image",
+        "CTRL+O", ":/viewer/images/addraster.png", 'addRaster', False, False),
+    ('addVectorFileAct', "Add Vector &File", 
+        "Open an OGR supported vector file",
+        "CTRL+V", ":/viewer/images/addvector.png", 'addVectorFile', 
+        False, False),
+    ('addVectorDirAct', "Add Vector &Directory", 
+        "Open an OGR supported vector directory",
+        None, ":/viewer/images/addvector.png", 'addVectorDir', False, False),
+    ('addVectorDBAct', "Add Vector Data&base", 
+        "Open a layer from an OGR supported database",
+        None, ":/viewer/images/addvector.png", 'addVectorDB', False, False),
+    ('removeLayerAct', "&Remove Layer", "Remove top layer",
+        "CTRL+R", ":/viewer/images/removelayer.png", 'removeLayer', 
+        False, False),
+    ('newWindowAct', "&New Window", "Create a new geo linked window",
+        "CTRL+N", ":/viewer/images/newwindow.png", 'newWindow', False, False),
+    ('tileWindowsAct', "&Tile Windows...", "Tile all open windows",
+        "CTRL+I", None, 'tileWindows', False, False),
+    ('defaultStretchAct', "&Default Stretch...", "Set default stretches",
+        "CTRL+D", None, 'defaultStretch', False, False),
+    ('stretchAct', "S&tretch", "Edit current stretch",
+        "CTRL+T", None, 'editStretch', False, False),
+    ('panAct', "&Pan", "Pan",
+        "CTRL+P", ":/viewer/images/pan.png", 'pan', True, True),
+    ('zoomInAct', "Zoom &In", "Zoom In",
+        "CTRL++", ":/viewer/images/zoomin.png", 'zoomIn', True, True),
+    ('zoomOutAct', "Zoom &Out", "Zoom Out",
+        "CTRL+-", ":/viewer/images/zoomout.png", 'zoomOut', True, True),
+    ('zoomNativeAct', "Zoom to &Native", "Zoom to Native Resolution",
+        "CTRL+1", ":/viewer/images/zoomnative.png", 'zoomNative', 
+        False, False),
+    ('zoomFullExtAct', "Zoom to &Full Extent", "Zoom to Full Extent",
+        "CTRL+F", ":/viewer/images/zoomfullextent.png", 'zoomFullExtent', 
+        False, False),
+    ('followExtentAct', "Follow &Extent", "Follow geolinked extent",
+        "CTRL+E", ":/viewer/images/followextents.png", 'followExtent', 
+        True, False),
+    ('queryAct', "&Query Tool", "Start Query Tool",
+        "CTRL+U", ":/viewer/images/query.png", 'query', True, True),
+    ('newQueryAct', "New Query &Window", "Open New Query Window",
+        "CTRL+W", None, 'newQueryWindow', False, False),
+    ('vectorQueryAct', "&Vector Query Tool", "Start Vector Query Tool",
+        "CTRL+C", ":/viewer/images/queryvector.png", 'vectorQuery', 
+        True, True),
+    ('newVectorQueryAct', "New Vector Query &Window", 
+        "Open New Vector Query Window",
+        None, None, 'newVectorQueryWindow', False, False),
+    ('queryOnlyDisplayedAct', "&Query Only Displayed Layers", 
+        "Query Only Displayed Layers with Query Window",
+        "CTRL+B", None, 'queryOnlyDisplayed', True, False),
+    ('exitAct', "&Close", "Close this window",
+        "CTRL+Q", None, 'close', False, False),
+    ('closeAllWindows', "C&lose All", "Close all windows",
+        "SHIFT+CTRL+Q", None, 'closeAll', False, False),
+    ('preferencesAct', "&Preferences", "Edit Preferences",
+        "CTRL+L", None, 'setPreferences', False, False),
+    ('flickerAct', "&Flicker", "Flicker top 2 layers",
+        "CTRL+K", ":/viewer/images/flickeron.png", 'flicker', False, False),
+    ('layerAct', "Arrange La&yers", "Arrange Layers",
+        "CTRL+Y", ":/viewer/images/layers.png", 'arrangeLayers', 
+        False, False),
+    ('profileAct', "&Profile/Ruler", "Start Profile/Ruler tool",
+        "CTRL+A", ":/viewer/images/profileruler.png", 'profile', True, True),
+    ('newProfileAct', "New P&rofile/Ruler Window", 
+        "Open New Profile/Ruler Window",
+        "CTRL+S", None, 'newProfile', False, False),
+    ('propertiesAct', "Properties", "Show Properties of top layer",
+        "CTRL+X", ":/viewer/images/properties.png", 'properties', 
+        False, False),
+    ('saveCurrentViewAct', "Save Current Display", 
+        "Save the contents of the current display as an image file",
+        None, None, 'saveCurrentView', False, False),
+    ('saveCurrentViewClipboardAct', "Save Current Display to Clipboard", 
+        "Save the contents of the current display to the clipboard",
+        None, None, 'saveCurrentViewClipboard', False, False),
+    ('saveCurrentViewersState', "Save State of All Viewers", 
+        "Save state of Viewers to a file so they can be restored",
+        None, None, 'saveViewersState', False, False),
+    ('loadCurrentViewersState', "Load State of Viewers", 
+        "Restore state of viewers previously saved",
+        None, None, 'loadViewersState', False, False),
+    ('aboutAct', "&About", "Show author and version information",
+        None, None, 'about', False, False)
+)
+
+
 def createFilter(driver):
     """
     Given a GDAL driver, creates the Qt QFileDialog
     compatible filter for the file type
     """
-    drivermeta = driver.GetMetadata()
-    name = 'Image Files'
-    if DMD_LONGNAME in drivermeta:
-        name = drivermeta[DMD_LONGNAME]
+    # just ask for the items we need rather than
+    # having GDAL build a dictionary of all the metadata
+    name = driver.GetMetadataItem(DMD_LONGNAME)
+    if name is None:
+        name = 'Image Files'
+    else:
         # get rid of any stuff in brackets - seems to
         # confuse Qt 4.x
-        firstbracket = name.find('(')
-        if firstbracket != -1:
-            name = name[:firstbracket]
-    qfilter = '*'
-    if DMD_EXTENSION in drivermeta:
-        qfilter = drivermeta[DMD_EXTENSION]
+        name = name.partition('(')[0].rstrip()
+    qfilter = driver.GetMetadataItem(DMD_EXTENSION)
+    if qfilter is None:
+        qfilter = '*'
     return "%s (*.%s)" % (name, qfilter)
 
 
@@ -130,27 +236,23 @@ def populateFilters(defaultDriver=DEFAULT_DRIVER):
                 GDAL_FILTERS.append(qfilter)
             else:
                 # If there is no GDAL driver try non-GDAL drivers dict
-                try:
-                    qfilter = NON_GDAL_FILTERS[defaultDriver]
+                qfilter = NON_GDAL_FILTERS.get(defaultDriver)
+                if qfilter is not None:
                     GDAL_FILTERS.append(qfilter)
-                except KeyError:
-                    pass
 
         # add all files next
         GDAL_FILTERS.append("All files (*)")
 
         # just go thru them all and create filters
-        for count in range(gdal.GetDriverCount()):
-            driver = gdal.GetDriver(count)
-            # we have already done the default driver
-            # and it looks a bit silly if it is in there again
-            if defaultDriver is None or driver.ShortName != defaultDriver:
-                qfilter = createFilter(driver)
-                GDAL_FILTERS.append(qfilter)
+        drivers = (gdal.GetDriver(count) 
+            for count in range(gdal.GetDriverCount()))
+        # we have already done the default driver
+        # and it looks a bit silly if it is in there again
+        GDAL_FILTERS.extend(createFilter(driver) for driver in drivers
+            if defaultDriver is None or driver.ShortName != defaultDriver)
 
         # Now add non-GDAL filters
-        for qfilter in NON_GDAL_FILTERS.values():
-            GDAL_FILTERS.append(qfilter)
+        GDAL_FILTERS.extend(NON_GDAL_FILTER_LIST)
 
 
 class WildcardFileDialog(QFileDialog):
@@ -162,6 +264,9 @@ class WildcardFileDialog(QFileDialog):
         # On Windows etc, ensure that the Qt dialog is used 
         # so our logic for working with widgets works...
         self.setOption(QFileDialog.DontUseNativeDialog)
+        # don't go looking for icons for each entry - very slow
+        # on network drives
+        self.setOption(QFileDialog.DontUseCustomDirectoryIcons)
         
         # create our button
         self.expandButton = QPushButton("&Expand Wildcards", self)
@@ -225,6 +330,9 @@ class ViewerWindow(QMainWindow):
     
     backgroundColor = None
     mouseWheelZoom = None
+    # the default stretch rules read from the settings, see
+    # findDefaultStretchForDataset()
+    defaultStretchRules = None
 
     def __init__(self):
         QMainWindow.__init__(self)
@@ -248,11 +356,34 @@ class ViewerWindow(QMainWindow):
 
         self.setCentralWidget(self.viewwidget)
 
+        # identifies this window when setting the active tool
+        # and in activeToolChanged. Saves calling id() each time
+        self.windowId = id(self)
+        # the tool action that is currently checked (if any)
+        self.activeToolAct = None
         self.setupActions()
         self.setupMenus()
         self.setupToolbars()
         self.setupStatusBar()
 
+        # once the GUI is idle, create the filters for the add 
+        # raster dialog so it comes up quickly the first time.
+        # Does nothing if they have already been created.
+        if GDAL_FILTERS is None:
+            QTimer.singleShot(0, populateFilters)
+
+        # the last directory the file dialogs were in. See getDialogDir()
+        self.lastDialogDirs = {'raster': None, 'vector': None, 'state': None}
+
+        # layer moved by moveFixedDist() waiting for finishMove()
+        self.pendingMoveLayer = None
+
+        # image used by saveCurrentViewInternal()
+        self.saveImage = None
+
+        # GeolinkInfo received while minimized. See doGeolinkMove()
+        self.pendingGeolinkMove = None
+
         # our layer window so we can toggle it
         self.layerWindow = None
 
@@ -297,6 +428,33 @@ class ViewerWindow(QMainWindow):
 
         # resize it to desired size
         self.resize(xsize + borderWidth, ysize + borderHeight)
+
+    def changeEvent(self, event):
+        """
+        We may have been restored and there is a geolink move
+        waiting from when we were minimized.
+        """
+        if (event.type() == QEvent.WindowStateChange and 
+                self.pendingGeolinkMove is not None and 
+                not self.isMinimized()):
+            obj = self.pendingGeolinkMove
+            self.pendingGeolinkMove = None
+            self.viewwidget.doGeolinkMove(obj.easting, obj.northing, 
+                        obj.metresperwinpix)
+        QMainWindow.changeEvent(self, event)
+
+    def doGeolinkMove(self, obj):
+        """
+        Called by GeolinkedViewers to move our widget to the location
+        in the GeolinkInfo. If we are minimized nothing can be seen
+        so just remember the latest one and do it when we are restored.
+        """
+        if self.isMinimized():
+            self.pendingGeolinkMove = obj
+        else:
+            self.pendingGeolinkMove = None
+            self.viewwidget.doGeolinkMove(obj.easting, obj.northing, 
+                        obj.metresperwinpix)
         
     def updateWindowTitle(self, layer):
         """
@@ -314,9 +472,10 @@ class ViewerWindow(QMainWindow):
         """
         Called when we are about to start a new progress
         """
-        self.statusBar().showMessage(string)
-        self.progressWidget.setValue(0)
-        self.progressWidget.setVisible(True)
+        self.statusbar.showMessage(string)
+        progressWidget = self.getProgressWidget()
+        progressWidget.setValue(0)
+        progressWidget.setVisible(True)
         self.setCursor(Qt.WaitCursor)  # look like we are busy
         # process any events show gets shown while busy
         QCoreApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
@@ -325,8 +484,9 @@ class ViewerWindow(QMainWindow):
         """
         Called when a progress run has finished
         """
-        self.statusBar().clearMessage()
-        self.progressWidget.setVisible(False)
+        self.statusbar.clearMessage()
+        if self.progressWidget is not None:
+            self.progressWidget.setVisible(False)
         self.setCursor(Qt.ArrowCursor)  # look like we are finished
         # process any events show gets shown while busy
         QCoreApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
@@ -335,7 +495,7 @@ class ViewerWindow(QMainWindow):
         """
         New progress value
         """
-        self.progressWidget.setValue(percent)
+        self.getProgressWidget().setValue(percent)
         # process any events show gets shown while busy
         QCoreApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
 
@@ -343,7 +503,7 @@ class ViewerWindow(QMainWindow):
         """
         Helper method to show a message for a short period of time
         """
-        self.statusBar().showMessage(message, MESSAGE_TIMEOUT)
+        self.statusbar.showMessage(message, MESSAGE_TIMEOUT)
         # process any events show gets shown while busy
         QCoreApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
 
@@ -352,17 +512,19 @@ class ViewerWindow(QMainWindow):
         Called when the active tool changed. If we didn't cause it
         then show our tools as disabled
         """
-        if obj.senderid != id(self):
+        if obj.senderid != self.windowId:
             self.activeToolChangedInternal()
             
     def activeToolChangedInternal(self):
         """
         Disable all tools, done on viewer reset
         """
-        self.suppressToolReset = True
-        for tool in self.toolActions:
-            tool.setChecked(False)
-        self.suppressToolReset = False
+        if self.activeToolAct is not None:
+            # only the active tool can be checked
+            self.suppressToolReset = True
+            self.activeToolAct.setChecked(False)
+            self.activeToolAct = None
+            self.suppressToolReset = False
 
     def restoreFromSettings(self):
         """
@@ -370,6 +532,8 @@ class ViewerWindow(QMainWindow):
         n.b. need to rationalize with preferences window
         """
         settings = QSettings()
+        # don't bother searching the system wide locations
+        settings.setFallbacksEnabled(False)
         settings.beginGroup('ViewerWindow')
 
         defaultsize = QSize(DEFAULT_XSIZE, DEFAULT_YSIZE)
@@ -398,38 +562,39 @@ class ViewerWindow(QMainWindow):
         self.settingArrangeLayersOpen = value
         settings.endGroup()
 
+    def _makeAction(self, spec):
+        """
+        Creates a QAction from one entry of ACTION_SPECS, sets it as
+        an attribute on this window and returns it
+        """
+        (attr, text, tip, shortcut, icon, slot, checkable, isTool) = spec
+        slot = getattr(self, slot)
+        action = QAction(self)
+        if checkable:
+            action.setCheckable(True)
+            action.toggled.connect(slot)
+        else:
+            action.triggered.connect(slot)
+        action.setText(text)
+        action.setStatusTip(tip)
+        if shortcut is not None:
+            action.setShortcut(shortcut)
+        if icon is not None:
+            action.setIcon(QIcon(icon))
+            action.setIconVisibleInMenu(True)
+        if isTool:
+            self.toolActions.append(action)
+        setattr(self, attr, action)
+        return action
+
     def setupActions(self):
         """
         Creates all the actions for the Window
         """
         self.toolActions = []
 
-        self.addRasterAct = QAction(self, triggered=self.addRaster)
-        self.addRasterAct.setText("&Add Raster")
-        self.addRasterAct.setStatusTip("Open a GDAL supported image")
-        self.addRasterAct.setShortcut("CTRL+O")
-        self.addRasterAct.setIcon(QIcon(":/viewer/images/addraster.png"))
-        self.addRasterAct.setIconVisibleInMenu(True)
-
-        self.addVectorFileAct = QAction(self, triggered=self.addVectorFile)
-        self.addVectorFileAct.setText("Add Vector &File")
-        self.addVectorFileAct.setStatusTip("Open an OGR supported vector file")
-        self.addVectorFileAct.setShortcut("CTRL+V")
-        self.addVectorFileAct.setIcon(QIcon(":/viewer/images/addvector.png"))
-        self.addVectorFileAct.setIconVisibleInMenu(True)
-
-        self.addVectorDirAct = QAction(self, triggered=self.addVectorDir)
-        self.addVectorDirAct.setText("Add Vector &Directory")
-        self.addVectorDirAct.setStatusTip("Open an OGR supported vector directory")
-        self.addVectorDirAct.setIcon(QIcon(":/viewer/images/addvector.png"))
-        self.addVectorDirAct.setIconVisibleInMenu(True)
-
-        self.addVectorDBAct = QAction(self, triggered=self.addVectorDB)
-        self.addVectorDBAct.setText("Add Vector Data&base")
-        self.addVectorDBAct.setStatusTip(
-            "Open a layer from an OGR supported database")
-        self.addVectorDBAct.setIcon(QIcon(":/viewer/images/addvector.png"))
-        self.addVectorDBAct.setIconVisibleInMenu(True)
+        for spec in ACTION_SPECS:
+            self._makeAction(spec)
 
         self.vectorMenu = QMenu()
         self.vectorMenu.setTitle("Add Vector")
@@ -437,227 +602,42 @@ class ViewerWindow(QMainWindow):
         self.vectorMenu.addAction(self.addVectorDirAct)
         self.vectorMenu.addAction(self.addVectorDBAct)
 
-        self.removeLayerAct = QAction(self, triggered=self.removeLayer)
-        self.removeLayerAct.setText("&Remove Layer")
-        self.removeLayerAct.setStatusTip("Remove top layer")
-        self.removeLayerAct.setShortcut("CTRL+R")
-        self.removeLayerAct.setIcon(QIcon(":/viewer/images/removelayer.png"))
-        self.removeLayerAct.setIconVisibleInMenu(True)
-
-        self.newWindowAct = QAction(self, triggered=self.newWindow)
-        self.newWindowAct.setText("&New Window")
-        self.newWindowAct.setStatusTip("Create a new geo linked window")
-        self.newWindowAct.setShortcut("CTRL+N")
-        self.newWindowAct.setIcon(QIcon(":/viewer/images/newwindow.png"))
-        self.newWindowAct.setIconVisibleInMenu(True)
-
-        self.tileWindowsAct = QAction(self, triggered=self.tileWindows)
-        self.tileWindowsAct.setText("&Tile Windows...")
-        self.tileWindowsAct.setStatusTip("Tile all open windows")
-        self.tileWindowsAct.setShortcut("CTRL+I")
-
-        self.defaultStretchAct = QAction(self, triggered=self.defaultStretch)
-        self.defaultStretchAct.setText("&Default Stretch...")
-        self.defaultStretchAct.setStatusTip("Set default stretches")
-        self.defaultStretchAct.setShortcut("CTRL+D")
-
-        self.stretchAct = QAction(self, triggered=self.editStretch)
-        self.stretchAct.setText("S&tretch")
-        self.stretchAct.setStatusTip("Edit current stretch")
-        self.stretchAct.setShortcut("CTRL+T")
         self.stretchAct.setEnabled(False)  # until a file is opened
-
-        self.panAct = QAction(self, toggled=self.pan)
-        self.panAct.setText("&Pan")
-        self.panAct.setStatusTip("Pan")
-        self.panAct.setShortcut("CTRL+P")
-        self.panAct.setCheckable(True)
-        self.panAct.setIcon(QIcon(":/viewer/images/pan.png"))
-        self.panAct.setIconVisibleInMenu(True)
-        self.toolActions.append(self.panAct)
-
-        self.zoomInAct = QAction(self, toggled=self.zoomIn)
-        self.zoomInAct.setText("Zoom &In")
-        self.zoomInAct.setStatusTip("Zoom In")
-        self.zoomInAct.setShortcut("CTRL++")
-        self.zoomInAct.setCheckable(True)
-        self.zoomInAct.setIcon(QIcon(":/viewer/images/zoomin.png"))
-        self.zoomInAct.setIconVisibleInMenu(True)
-        self.toolActions.append(self.zoomInAct)
-
-        self.zoomOutAct = QAction(self, toggled=self.zoomOut)
-        self.zoomOutAct.setText("Zoom &Out")
-        self.zoomOutAct.setStatusTip("Zoom Out")
-        self.zoomOutAct.setShortcut("CTRL+-")
-        self.zoomOutAct.setCheckable(True)
-        self.zoomOutAct.setIcon(QIcon(":/viewer/images/zoomout.png"))
-        self.zoomOutAct.setIconVisibleInMenu(True)
-        self.toolActions.append(self.zoomOutAct)
-
-        self.zoomNativeAct = QAction(self, triggered=self.zoomNative)
-        self.zoomNativeAct.setText("Zoom to &Native")
-        self.zoomNativeAct.setStatusTip("Zoom to Native Resolution")
-        self.zoomNativeAct.setShortcut("CTRL+1")
-        self.zoomNativeAct.setIcon(QIcon(":/viewer/images/zoomnative.png"))
-        self.zoomNativeAct.setIconVisibleInMenu(True)
-
-        self.zoomFullExtAct = QAction(self, triggered=self.zoomFullExtent)
-        self.zoomFullExtAct.setText("Zoom to &Full Extent")
-        self.zoomFullExtAct.setStatusTip("Zoom to Full Extent")
-        self.zoomFullExtAct.setShortcut("CTRL+F")
-        self.zoomFullExtAct.setIcon(QIcon(":/viewer/images/zoomfullextent.png"))
-        self.zoomFullExtAct.setIconVisibleInMenu(True)
-
-        self.followExtentAct = QAction(self, toggled=self.followExtent)
-        self.followExtentAct.setText("Follow &Extent")
-        self.followExtentAct.setStatusTip("Follow geolinked extent")
-        self.followExtentAct.setShortcut("CTRL+E")
-        self.followExtentAct.setCheckable(True)
         self.followExtentAct.setChecked(True)  # by default to match viewerwidget
-        self.followExtentAct.setIcon(QIcon(":/viewer/images/followextents.png"))
-        self.followExtentAct.setIconVisibleInMenu(True)
-
-        self.queryAct = QAction(self, toggled=self.query)
-        self.queryAct.setText("&Query Tool")
-        self.queryAct.setStatusTip("Start Query Tool")
-        self.queryAct.setShortcut("CTRL+U")
-        self.queryAct.setCheckable(True)
-        self.queryAct.setIcon(QIcon(":/viewer/images/query.png"))
-        self.queryAct.setIconVisibleInMenu(True)
-        self.toolActions.append(self.queryAct)
-
-        self.newQueryAct = QAction(self, triggered=self.newQueryWindow)
-        self.newQueryAct.setText("New Query &Window")
-        self.newQueryAct.setStatusTip("Open New Query Window")
-        self.newQueryAct.setShortcut("CTRL+W")
-
-        self.vectorQueryAct = QAction(self, toggled=self.vectorQuery)
-        self.vectorQueryAct.setText("&Vector Query Tool")
-        self.vectorQueryAct.setStatusTip("Start Vector Query Tool")
-        self.vectorQueryAct.setShortcut("CTRL+C")
-        self.vectorQueryAct.setCheckable(True)
-        self.vectorQueryAct.setIcon(QIcon(":/viewer/images/queryvector.png"))
-        self.vectorQueryAct.setIconVisibleInMenu(True)
-        self.toolActions.append(self.vectorQueryAct)
-
-        self.newVectorQueryAct = QAction(self, 
-                                        triggered=self.newVectorQueryWindow)
-        self.newVectorQueryAct.setText("New Vector Query &Window")
-        self.newVectorQueryAct.setStatusTip("Open New Vector Query Window")
-
-        self.queryOnlyDisplayedAct = QAction(self, 
-                                        toggled=self.queryOnlyDisplayed)
-        self.queryOnlyDisplayedAct.setText("&Query Only Displayed Layers")
-        self.queryOnlyDisplayedAct.setCheckable(True)
-        self.queryOnlyDisplayedAct.setShortcut("CTRL+B")
-        self.queryOnlyDisplayedAct.setStatusTip(
-            "Query Only Displayed Layers with Query Window")
-
-        self.exitAct = QAction(self, triggered=self.close)
-        self.exitAct.setText("&Close")
-        self.exitAct.setStatusTip("Close this window")
-        self.exitAct.setShortcut("CTRL+Q")
-
-        self.closeAllWindows = QAction(self, triggered=self.closeAll)
-        self.closeAllWindows.setText("C&lose All")
-        self.closeAllWindows.setStatusTip("Close all windows")
-        self.closeAllWindows.setShortcut("SHIFT+CTRL+Q")
-
-        self.preferencesAct = QAction(self, triggered=self.setPreferences)
-        self.preferencesAct.setText("&Preferences")
-        self.preferencesAct.setStatusTip("Edit Preferences")
-        self.preferencesAct.setShortcut("CTRL+L")
-
-        self.flickerAct = QAction(self, triggered=self.flicker)
-        self.flickerAct.setText("&Flicker")
-        self.flickerAct.setStatusTip("Flicker top 2 layers")
-        self.flickerAct.setShortcut("CTRL+K")
+
         self.flickerAct.iconOn = QIcon(":/viewer/images/flickeron.png")
         self.flickerAct.iconOff = QIcon(":/viewer/images/flickeroff.png")
-        self.flickerAct.setIcon(self.flickerAct.iconOn)
-        self.flickerAct.setIconVisibleInMenu(True)
-
-        self.layerAct = QAction(self, triggered=self.arrangeLayers)
-        self.layerAct.setText("Arrange La&yers")
-        self.layerAct.setStatusTip("Arrange Layers")
-        self.layerAct.setShortcut("CTRL+Y")
-        self.layerAct.setIcon(QIcon(":/viewer/images/layers.png"))
-        self.layerAct.setIconVisibleInMenu(True)
-
-        self.profileAct = QAction(self, toggled=self.profile)
-        self.profileAct.setText("&Profile/Ruler")
-        self.profileAct.setStatusTip("Start Profile/Ruler tool")
-        self.profileAct.setShortcut("CTRL+A")
-        self.profileAct.setCheckable(True)
-        self.profileAct.setIcon(QIcon(":/viewer/images/profileruler.png"))
-        self.profileAct.setIconVisibleInMenu(True)
-        self.toolActions.append(self.profileAct)
-
-        self.newProfileAct = QAction(self, triggered=self.newProfile)
-        self.newProfileAct.setText("New P&rofile/Ruler Window")
-        self.newProfileAct.setStatusTip("Open New Profile/Ruler Window")
-        self.newProfileAct.setShortcut("CTRL+S")
-
-        self.propertiesAct = QAction(self, triggered=self.properties)
-        self.propertiesAct.setText("Properties")
-        self.propertiesAct.setStatusTip("Show Properties of top layer")
-        self.propertiesAct.setShortcut("CTRL+X")
-        self.propertiesAct.setIcon(QIcon(":/viewer/images/properties.png"))
-        self.propertiesAct.setIconVisibleInMenu(True)
-
-        self.timeseriesForwardAct = QAction(self, 
-                        triggered=self.viewwidget.timeseriesForward)
+
+        self.timeseriesForwardAct = QAction(self)
+        self.timeseriesForwardAct.triggered.connect(self.viewwidget.timeseriesForward)
         self.timeseriesForwardAct.setShortcut(".")
         self.timeseriesForwardAct.setText("Timeseries Forward")
         self.timeseriesForwardAct.setStatusTip(
             "Go forward through timeseries of images")
 
-        self.timeseriesBackwardAct = QAction(self, 
-                        triggered=self.viewwidget.timeseriesBackward)
+        self.timeseriesBackwardAct = QAction(self)
+        self.timeseriesBackwardAct.triggered.connect(self.viewwidget.timeseriesBackward)
         self.timeseriesBackwardAct.setShortcut(",")
         self.timeseriesBackwardAct.setText("Timeseries Backward")
         self.timeseriesBackwardAct.setStatusTip(
             "Go backward through timeseries of images")
 
-        self.saveCurrentViewAct = QAction(self, triggered=self.saveCurrentView)
-        self.saveCurrentViewAct.setText("Save Current Display")
-        self.saveCurrentViewAct.setStatusTip(
-            "Save the contents of the current display as an image file")
-
-        self.saveCurrentViewClipboardAct = QAction(self, 
-            triggered=self.saveCurrentViewClipboard)
-        self.saveCurrentViewClipboardAct.setText("Save Current Display to Clipboard")
-        self.saveCurrentViewClipboardAct.setStatusTip(
-            "Save the contents of the current display to the clipboard")
-
-        self.saveCurrentViewersState = QAction(self, 
-                            triggered=self.saveViewersState)
-        self.saveCurrentViewersState.setText("Save State of All Viewers")
-        self.saveCurrentViewersState.setStatusTip(
-            "Save state of Viewers to a file so they can be restored")
-
-        self.loadCurrentViewersState = QAction(self, 
-                            triggered=self.loadViewersState)
-        self.loadCurrentViewersState.setText("Load State of Viewers")
-        self.loadCurrentViewersState.setStatusTip(
-            "Restore state of viewers previously saved")
-
-        self.aboutAct = QAction(self, triggered=self.about)
-        self.aboutAct.setText("&About")
-        self.aboutAct.setStatusTip("Show author and version information")
-
         # Actions just for keyboard shortcuts
 
-        self.moveUpAct = QAction(self, triggered=self.moveUp)
+        self.moveUpAct = QAction(self)
+        self.moveUpAct.triggered.connect(self.moveUp)
         self.moveUpAct.setShortcut(Qt.CTRL | Qt.Key_Up)
 
-        self.moveDownAct = QAction(self, triggered=self.moveDown)
+        self.moveDownAct = QAction(self)
+        self.moveDownAct.triggered.connect(self.moveDown)
         self.moveDownAct.setShortcut(Qt.CTRL | Qt.Key_Down)
 
-        self.moveLeftAct = QAction(self, triggered=self.moveLeft)
+        self.moveLeftAct = QAction(self)
+        self.moveLeftAct.triggered.connect(self.moveLeft)
         self.moveLeftAct.setShortcut(Qt.CTRL | Qt.Key_Left)
 
-        self.moveRightAct = QAction(self, triggered=self.moveRight)
+        self.moveRightAct = QAction(self)
+        self.moveRightAct.triggered.connect(self.moveRight)
         self.moveRightAct.setShortcut(Qt.CTRL | Qt.Key_Right)
 
         self.addAction(self.moveUpAct)
@@ -750,12 +730,24 @@ class ViewerWindow(QMainWindow):
         Sets up the status bar
         """
         statusbar = self.statusBar()
+        # keep a reference so we don't need to call statusBar() each time
+        self.statusbar = statusbar
         statusbar.setSizeGripEnabled(True)
-        self.progressWidget = QProgressBar(statusbar)
-        self.progressWidget.setMinimum(0)
-        self.progressWidget.setMaximum(100)
-        self.progressWidget.setVisible(False)
-        statusbar.addPermanentWidget(self.progressWidget)
+        # created when first needed by getProgressWidget()
+        self.progressWidget = None
+
+    def getProgressWidget(self):
+        """
+        Returns the progress bar in the status bar, creating it
+        if this is the first time it has been needed
+        """
+        if self.progressWidget is None:
+            self.progressWidget = QProgressBar(self.statusbar)
+            self.progressWidget.setMinimum(0)
+            self.progressWidget.setMaximum(100)
+            self.progressWidget.setVisible(False)
+            self.statusbar.addPermanentWidget(self.progressWidget)
+        return self.progressWidget
 
     def newWindow(self):
         """
@@ -786,7 +778,32 @@ class ViewerWindow(QMainWindow):
         Show the default stretch dialog
         """
         dlg = stretchdialog.StretchDefaultsDialog(self)
-        dlg.exec_()
+        if dlg.exec_() == QDialog.Accepted:
+            # new rules have been saved, so read them again next time
+            ViewerWindow.defaultStretchRules = None
+
+    def getDialogDir(self, kind):
+        """
+        Returns the directory a file dialog for the given kind 
+        ('raster', 'vector' or 'state') should start in. This is the 
+        last directory used for this kind, otherwise the directory 
+        the top layer of that kind is in, otherwise the current directory.
+        The layers are only looked at if there is no last directory.
+        """
+        dirn = self.lastDialogDirs[kind]
+        if dirn is not None:
+            return dirn
+        layers = self.viewwidget.layers
+        if kind == 'raster':
+            layer = layers.getTopRasterLayer()
+        elif kind == 'vector':
+            layer = layers.getTopVectorLayer()
+        else:
+            layer = layers.getTopLayer()
+        if layer is not None:
+            dirn, _ = os.path.split(layer.filename)
+        # no layer, or layer has no directory
+        return dirn or os.getcwd()
 
     def addRaster(self):
         """
@@ -799,19 +816,12 @@ class ViewerWindow(QMainWindow):
         dlg.setNameFilters(GDAL_FILTERS)
         dlg.setFileMode(QFileDialog.ExistingFiles)
         # set last dir
-        layer = self.viewwidget.layers.getTopRasterLayer()
-        if layer is not None:
-            dirn = os.path.dirname(layer.filename)
-            if dirn == '':
-                dirn = os.getcwd()
-        else:
-            # or cwd
-            dirn = os.getcwd()
-
+        dirn = self.getDialogDir('raster')
         dlg.setDirectory(dirn)
 
         if dlg.exec_() == QDialog.Accepted:
             file_list = dlg.selectedFiles()
+            self.lastDialogDirs['raster'] = dlg.directory().absolutePath()
             for fname in archivereader.file_list_to_archive_strings(file_list):
                 self.addRasterInternal(fname)
 
@@ -822,22 +832,16 @@ class ViewerWindow(QMainWindow):
         From a file.
         """
         dlg = QFileDialog(self)
+        dlg.setOption(QFileDialog.DontUseCustomDirectoryIcons)
         dlg.setNameFilter("OGR Files (*)")
         dlg.setFileMode(QFileDialog.ExistingFile)
         # set last dir
-        layer = self.viewwidget.layers.getTopVectorLayer()
-        if layer is not None:
-            dirn = os.path.dirname(layer.filename)
-            if dirn == '':
-                dirn = os.getcwd()
-        else:
-            # or cwd
-            dirn = os.getcwd()
-
+        dirn = self.getDialogDir('vector')
         dlg.setDirectory(dirn)
 
         if dlg.exec_() == QDialog.Accepted:
             fname = dlg.selectedFiles()[0]
+            self.lastDialogDirs['vector'] = os.path.dirname(fname)
             self.addVectorInternal(fname)
 
     def addVectorDir(self):
@@ -845,19 +849,14 @@ class ViewerWindow(QMainWindow):
         Add a vector from a directory (filegdb/covereage)
         """
         # set last dir
-        layer = self.viewwidget.layers.getTopVectorLayer()
-        if layer is not None:
-            olddir = os.path.dirname(layer.filename)
-            if olddir == '':
-                olddir = os.getcwd()
-        else:
-            # or cwd
-            olddir = os.getcwd()
+        olddir = self.getDialogDir('vector')
 
         dirn = QFileDialog.getExistingDirectory(self, "Choose vector directory",
             directory=olddir,
-            options=QFileDialog.ShowDirsOnly | QFileDialog.DontResolveSymlinks)
+            options=QFileDialog.ShowDirsOnly | QFileDialog.DontResolveSymlinks |
+                QFileDialog.DontUseCustomDirectoryIcons)
         if dirn != "":
+            self.lastDialogDirs['vector'] = os.path.dirname(dirn)
             self.addVectorInternal(dirn)
 
     def addVectorDB(self):
@@ -869,17 +868,23 @@ class ViewerWindow(QMainWindow):
         if ok and con != "":
             self.addVectorInternal(con)
 
-    @staticmethod
-    def findDefaultStretchForDataset(gdaldataset):
+    @classmethod
+    def findDefaultStretchForDataset(cls, gdaldataset):
         """
         Attempts to find the default stretch that matches the
         given gdal dataset. Returns None on failure.
         """
+        rules = cls.defaultStretchRules
+        if rules is None:
+            # shared by all the windows. Reset by defaultStretch()
+            rules = stretchdialog.StretchDefaultsDialog.fromSettings()
+            ViewerWindow.defaultStretchRules = rules
+
         stretch = None
-        defaultList = stretchdialog.StretchDefaultsDialog.fromSettings()
-        for rule in defaultList:
+        for rule in rules:
             if rule.isMatch(gdaldataset):
-                stretch = rule.stretch
+                # copy so the layer doesn't share it with the rule
+                stretch = copy.copy(rule.stretch)
                 break
         return stretch
 
@@ -893,6 +898,11 @@ class ViewerWindow(QMainWindow):
         lut = None
         # first open the dataset
         try:
+            # don't make GDAL go through all the drivers for
+            # a file that can't be anything
+            if os.path.isfile(fname) and os.path.getsize(fname) == 0:
+                raise RuntimeError('File is empty')
+
             gdal.PushErrorHandler('CPLQuietErrorHandler')
             gdaldataset = gdal.Open(fname)
         except RuntimeError as err:
@@ -925,54 +935,68 @@ class ViewerWindow(QMainWindow):
                 self.defaultStretch()
                 return
 
-        # now open it for real
-        try:
-            self.viewwidget.addRasterLayer(gdaldataset, stretch, lut)
-        except viewererrors.ProjectionMismatch:
-            # as the user if they really want to go ahead
-            btn = QMessageBox.question(self, MESSAGE_TITLE, 
-                """Projection is different to existing file(s). 
+        # now open it for real. If the saved stretch is invalid we 
+        # go around again with the default stretch
+        triedDefaultStretch = False
+        while True:
+            try:
+                self.viewwidget.addRasterLayer(gdaldataset, stretch, lut)
+            except viewererrors.ProjectionMismatch:
+                # as the user if they really want to go ahead
+                btn = QMessageBox.question(self, MESSAGE_TITLE, 
+                    """Projection is different to existing file(s). 
 Results may be incorrect. Do you wish to go ahead anyway?""", 
-                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-            if btn == QMessageBox.Yes:
-                # try again with the flag
-                try:
-                    self.viewwidget.addRasterLayer(gdaldataset, stretch, lut,
-                            ignoreProjectionMismatch=True)
-                except Exception as e:
-                    if SHOW_TRACEBACK:
-                        traceback.print_exc()
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if btn == QMessageBox.Yes:
+                    # try again with the flag
+                    try:
+                        self.viewwidget.addRasterLayer(gdaldataset, stretch, 
+                                lut, ignoreProjectionMismatch=True)
+                    except Exception as e:
+                        if SHOW_TRACEBACK:
+                            traceback.print_exc()
+                        if showError:
+                            QMessageBox.critical(self, MESSAGE_TITLE, str(e))
+                        else:
+                            raise
+            except viewererrors.InvalidStretch as e:
+                if triedDefaultStretch:
+                    # default stretch no good either
                     if showError:
                         QMessageBox.critical(self, MESSAGE_TITLE, str(e))
+                        return
                     else:
                         raise
-        except viewererrors.InvalidStretch:
-            # probably band referred to in stretch no longer exists
-            # display error and fall back on default stretch
-            QMessageBox.information(self, MESSAGE_TITLE,
-                """Saved stretch refers to invalid band(s).
-File will now be opened using default stretch""")
-
-            stretch = self.findDefaultStretchForDataset(gdaldataset)
-            if stretch is None:
-                del gdaldataset
-                msg = ("File has no stretch saved and none of the default " + 
-                "stretches match\nThe default stretch dialog will now open.")
-                QMessageBox.warning(self, MESSAGE_TITLE, msg)
-                self.defaultStretch()
-                return
 
-            # now call this function again with default stretch
-            del gdaldataset
-            self.addRasterInternal(fname, stretch=stretch)
+                # probably band referred to in stretch no longer exists
+                # display error and fall back on default stretch
+                QMessageBox.information(self, MESSAGE_TITLE,
+                    """Saved stretch refers to invalid band(s).
+File will now be opened using default stretch""")
 
-        except Exception as e:
-            if SHOW_TRACEBACK:
-                traceback.print_exc()
-            if showError:
-                QMessageBox.critical(self, MESSAGE_TITLE, str(e))
-            else:
-                raise
+                stretch = self.findDefaultStretchForDataset(gdaldataset)
+                if stretch is None:
+                    del gdaldataset
+                    msg = ("File has no stretch saved and none of the default " + 
+                    "stretches match\nThe default stretch dialog will now open.")
+                    QMessageBox.warning(self, MESSAGE_TITLE, msg)
+                    self.defaultStretch()
+                    return
+
+                # now go around again with the default stretch
+                # reusing the dataset we already have open
+                lut = None
+                triedDefaultStretch = True
+                continue
+
+            except Exception as e:
+                if SHOW_TRACEBACK:
+                    traceback.print_exc()
+                if showError:
+                    QMessageBox.critical(self, MESSAGE_TITLE, str(e))
+                else:
+                    raise
+            break
 
         # allow the stretch to be edited
         self.stretchAct.setEnabled(True)
@@ -999,10 +1023,8 @@ File will now be opened using default stretch""")
                 numLayers = ds.GetLayerCount()
                 if numLayers == 0:
                     raise IOError("no valid layers")
-                layerNames = []
-                for n in range(ds.GetLayerCount()):
-                    name = ds.GetLayer(n).GetName()
-                    layerNames.append(name)
+                getLayer = ds.GetLayer
+                layerNames = [getLayer(n).GetName() for n in range(numLayers)]
 
                 dlg = vectoropendialog.VectorOpenDialog(self, layerNames)
                 if dlg.exec_() == QDialog.Accepted:
@@ -1089,12 +1111,11 @@ File will now be opened using default stretch""")
     def disableTools(self, ignoreTool=None):
         """
         Disable all tool actions apart from ignoreTool
+        which becomes the active tool
         """
-        tools = (self.panAct, self.zoomInAct, self.zoomOutAct, 
-            self.queryAct, self.profileAct, self.vectorQueryAct)
-        for tool in tools:
-            if tool is not ignoreTool:
-                tool.setChecked(False)
+        if self.activeToolAct is not None and self.activeToolAct is not ignoreTool:
+            self.activeToolAct.setChecked(False)
+        self.activeToolAct = ignoreTool
 
     def zoomIn(self, checked):
         """
@@ -1105,10 +1126,10 @@ File will now be opened using default stretch""")
             # disable any other tools
             self.disableTools(self.zoomInAct)
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_ZOOMIN, 
-                        id(self))
+                        self.windowId)
         elif not self.suppressToolReset:
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                        id(self))
+                        self.windowId)
 
     def zoomOut(self, checked):
         """
@@ -1119,10 +1140,10 @@ File will now be opened using default stretch""")
             # disable any other tools
             self.disableTools(self.zoomOutAct)
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_ZOOMOUT, 
-                        id(self))
+                        self.windowId)
         elif not self.suppressToolReset:
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                        id(self))
+                        self.windowId)
 
     def pan(self, checked):
         """
@@ -1133,10 +1154,10 @@ File will now be opened using default stretch""")
             # disable any other tools
             self.disableTools(self.panAct)
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_PAN, 
-                        id(self))
+                        self.windowId)
         elif not self.suppressToolReset:
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                        id(self))
+                        self.windowId)
 
     def moveFixedDist(self, xdist, ydist):
         layer = self.viewwidget.layers.getTopRasterLayer()
@@ -1149,6 +1170,20 @@ File will now be opened using default stretch""")
             layer.coordmgr.setTopLeftPixel(pixNewX, pixNewY)
             layer.coordmgr.recalcBottomRight()
             # print layer.coordmgr
+            # do the redraw once we are back in the event loop so
+            # a run of key presses only causes one redraw
+            if self.pendingMoveLayer is None:
+                QTimer.singleShot(0, self.finishMove)
+            self.pendingMoveLayer = layer
+
+    def finishMove(self):
+        """
+        Called by the single shot timer set up in moveFixedDist()
+        to redraw and geolink after the move(s)
+        """
+        layer = self.pendingMoveLayer
+        self.pendingMoveLayer = None
+        if layer is not None:
             # reset
             self.viewwidget.paintPoint.setX(0)
             self.viewwidget.paintPoint.setY(0)
@@ -1161,16 +1196,16 @@ File will now be opened using default stretch""")
             self.viewwidget.emitGeolinkMoved()
 
     def moveUp(self):
-        self.moveFixedDist(0, -1 * self.viewwidget.size().height())
+        self.moveFixedDist(0, -self.viewwidget.height())
 
     def moveDown(self):
-        self.moveFixedDist(0, self.viewwidget.size().height())
+        self.moveFixedDist(0, self.viewwidget.height())
 
     def moveLeft(self):
-        self.moveFixedDist(-1 * self.viewwidget.size().width(), 0)
+        self.moveFixedDist(-self.viewwidget.width(), 0)
 
     def moveRight(self):
-        self.moveFixedDist(self.viewwidget.size().width(), 0)
+        self.moveFixedDist(self.viewwidget.width(), 0)
 
     def zoomNative(self):
         """
@@ -1178,7 +1213,7 @@ File will now be opened using default stretch""")
         """
         # also removes any toolpoints drawn
         self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                        id(self))
+                        self.windowId)
         self.activeToolChangedInternal()
         try:
             self.viewwidget.zoomNativeResolution()
@@ -1191,7 +1226,7 @@ File will now be opened using default stretch""")
         """
         # also removes any toolpoints drawn
         self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                        id(self))
+                        self.windowId)
         self.activeToolChangedInternal()
         try:
             self.viewwidget.zoomFullExtent()
@@ -1214,14 +1249,14 @@ File will now be opened using default stretch""")
             # disable any other tools
             self.disableTools(self.queryAct)
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_QUERY, 
-                    id(self))
+                    self.windowId)
 
             # if there is no query window currently open start one
             if self.queryWindowCount <= 0:
                 self.newQueryWindow()
         elif not self.suppressToolReset:
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                    id(self))
+                    self.windowId)
 
     def queryClosed(self, queryDock):
         """
@@ -1274,14 +1309,14 @@ File will now be opened using default stretch""")
         if checked:
             self.disableTools(self.vectorQueryAct)
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_VECTORQUERY,
-                    id(self))
+                    self.windowId)
 
             # if no window, start one
             if self.vectorQueryWindowCount <= 0:
                 self.newVectorQueryWindow()
         elif not self.suppressToolReset:
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                        id(self))
+                        self.windowId)
 
     def newVectorQueryWindow(self):
         """
@@ -1334,14 +1369,14 @@ File will now be opened using default stretch""")
             # disable any other tools
             self.disableTools(self.profileAct)
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_POLYLINE, 
-                        id(self))
+                        self.windowId)
 
             # if there is no query window currently open start one
             if self.profileWindowCount <= 0:
                 self.newProfile()
         elif not self.suppressToolReset:
             self.viewwidget.setActiveTool(viewerwidget.VIEWER_TOOL_NONE, 
-                        id(self))
+                        self.windowId)
 
     def newProfile(self):
         profileDock = profilewindow.ProfileDockWidget(self, self.viewwidget)
@@ -1405,7 +1440,8 @@ File will now be opened using default stretch""")
         geotiffFilter = "Geotiff file (*.tif)"
         
         fname, filtern = QFileDialog.getSaveFileName(self, "Image File", 
-                        filter=';;'.join([imageFilter, geotiffFilter]))
+            filter=';;'.join([imageFilter, geotiffFilter]),
+            options=QFileDialog.DontUseCustomDirectoryIcons)
         if fname != '':
             if filtern == imageFilter:
                 self.saveCurrentViewInternal(fname)
@@ -1427,9 +1463,15 @@ File will now be opened using default stretch""")
         """
         Saves the current view as an image file as the file given
         """
-        # first grab it out of the widget
-        img = QImage(self.viewwidget.viewport().size(), QImage.Format_RGB32)
-        self.viewwidget.viewport().render(img)
+        # first grab it out of the widget. Reuse the image from
+        # last time if the size hasn't changed
+        viewport = self.viewwidget.viewport()
+        size = viewport.size()
+        if self.saveImage is None or self.saveImage.size() != size:
+            self.saveImage = QImage(size, QImage.Format_RGB32)
+        img = self.saveImage
+        img.fill(0)
+        viewport.render(img)
 
         if not img.save(fname):
             QMessageBox.critical(self, MESSAGE_TITLE, 
@@ -1438,7 +1480,6 @@ File will now be opened using default stretch""")
             # save a world file while we are at it
             # see http://en.wikipedia.org/wiki/World_file
             worldfname = fname + 'w'
-            worldfObj = None
             try:
                 layer = self.viewwidget.layers.getTopRasterLayer()
                 if layer is not None:
@@ -1447,18 +1488,15 @@ File will now be opened using default stretch""")
                     (left, top, _, _) = (
                         layer.coordmgr.getWorldExtent())
 
-                    worldfObj = open(worldfname, 'w')
-                    worldfObj.write("%f\n" % metresperwinpix)
-                    worldfObj.write("0.0\n0.0\n")
-                    worldfObj.write("%f\n" % -metresperwinpix)
-                    worldfObj.write("%f\n" % (left + (metresperwinpix / 2.0)))
-                    worldfObj.write("%f\n" % (top + (metresperwinpix / 2.0)))
+                    # write it all at once
+                    worldStr = WORLD_FILE_FORMAT % (metresperwinpix,
+                        -metresperwinpix, left + (metresperwinpix / 2.0),
+                        top + (metresperwinpix / 2.0))
+                    with open(worldfname, 'w') as worldfObj:
+                        worldfObj.write(worldStr)
             except IOError:
                 QMessageBox.critical(self, MESSAGE_TITLE,
                     "Unable to save world file: %s" % worldfname)
-            finally:
-                if worldfObj is not None:
-                    worldfObj.close()
                     
     def saveCurrentViewInternalGDAL(self, fname, driver, creationOptions):
         """
@@ -1499,8 +1537,7 @@ Numpy Version: %s<br>
 Label Font Information: %s<br></p>
 """
         appDir = os.path.dirname(os.path.abspath(sys.argv[0]))
-        pyVer = "%d.%d.%d" % (sys.version_info.major, sys.version_info.minor,
-                    sys.version_info.micro)
+        pyVer = platform.python_version()
         fontInfo = "%s %d %d %d" % (FONT_FAMILY, FONT_POINTSIZE, 
                 FONT_WEIGHT, FONT_ITALIC)
         msg = msg % (TUIVIEW_VERSION, appDir, gdalVersion, PYSIDE_VERSION_STR, 
@@ -1508,14 +1545,11 @@ Label Font Information: %s<br></p>
 
         # centre each line - doesn't work very well due to font
         msgLines = msg.split('\n')
-        maxLine = max(len(line) for line in msgLines)
-        centredMsgs = []
-        for line in msgLines:
-            leftSpaces = int((maxLine - len(line)) / 2.0)
-            centred = (' ' * leftSpaces) + line
-            centredMsgs.append(centred)
+        maxLine = max(map(len, msgLines))
+        centredMsg = "\n".join(line.center(maxLine).rstrip() 
+            for line in msgLines)
 
-        QMessageBox.about(self, MESSAGE_TITLE, "\n".join(centredMsgs))
+        QMessageBox.about(self, MESSAGE_TITLE, centredMsg)
 
     def closeEvent(self, event):
         """
@@ -1523,6 +1557,8 @@ Label Font Information: %s<br></p>
         Check that any of the query windows don't have unsaved data
         """
         settings = QSettings()
+        # don't bother searching the system wide locations
+        settings.setFallbacksEnabled(False)
         settings.beginGroup('ViewerWindow')
         settings.setValue("size", self.size())
         settings.setValue("pos", self.pos())
@@ -1596,41 +1632,30 @@ Label Font Information: %s<br></p>
         Get the geolinked viewers class to save the state as a file
         """
         # set last dir
-        layer = self.viewwidget.layers.getTopLayer()
-        if layer is not None:
-            dirn = os.path.dirname(layer.filename)
-            if dirn == '':
-                dirn = os.getcwd()
-        else:
-            # or cwd
-            dirn = os.getcwd()
+        dirn = self.getDialogDir('state')
         fname, _ = QFileDialog.getSaveFileName(self, 
                     "Select file to save state into",
                     dirn, "TuiView State .tuiview (*.tuiview)")
 
         if fname != "":
-            fileobj = open(fname, 'w')
-            self.writeViewersState.emit(fileobj)
-            fileobj.close()
+            self.lastDialogDirs['state'] = os.path.dirname(fname)
+            # state is written a line at a time so use a large buffer
+            with open(fname, 'w', buffering=STATE_FILE_BUFFER_SIZE, 
+                    encoding='utf-8') as fileobj:
+                self.writeViewersState.emit(fileobj)
 
     def loadViewersState(self):
         """
         Get the geolinked viewers class to open previously saved state file
         """
         # set last dir
-        layer = self.viewwidget.layers.getTopLayer()
-        if layer is not None:
-            dirn = os.path.dirname(layer.filename)
-            if dirn == '':
-                dirn = os.getcwd()
-        else:
-            # or cwd
-            dirn = os.getcwd()
+        dirn = self.getDialogDir('state')
         fname, _ = QFileDialog.getOpenFileName(self, "Select file to restore state from",
                     dirn, "TuiView State .tuiview (*.tuiview)")
 
         if fname != "":
-            fileobj = open(fname)
-            self.readViewersState.emit(fileobj)
-            fileobj.close()
+            self.lastDialogDirs['state'] = os.path.dirname(fname)
+            with open(fname, buffering=STATE_FILE_BUFFER_SIZE, 
+                    encoding='utf-8') as fileobj:
+                self.readViewersState.emit(fileobj)
 
@@ -25,11 +25,17 @@ and delete specified tables.
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import os
 import sys
 import argparse
 from osgeo import gdal
 from tuiview.viewerLUT import ViewerLUT
 from tuiview.viewerRAT import ViewerRAT
+from tuiview.viewererrors import InvalidColorTable
+
+# LUTs already read by addTables() keyed on (source, mtime) so
+# the same color table can be written to many files cheaply
+LUT_CACHE = {}
 
 
 def getCmdargs():
@@ -37,8 +43,12 @@ def getCmdargs():
     Get commandline arguments
     """
     p = argparse.ArgumentParser()
-    p.add_argument("-s", "--source", help="File to read color table from")
-    p.add_argument("-n", "--name", help="name to save the color table under")
+    p.add_argument("-s", "--source", action="append", 
+            help="File to read color table from. Can be given more than " +
+            "once to write several tables in one go (with a --name for each)")
+    p.add_argument("-n", "--name", action="append",
+            help="name to save the color table under. Can be given more " +
+            "than once")
     p.add_argument("-d", "--dest", 
             help="destination file to write color table into")
     p.add_argument("-p", "--print", dest="printct",
@@ -63,6 +73,11 @@ def getCmdargs():
         msg = "Must specify --name for --remove"
         raise SystemExit(msg)
 
+    if (cmdargs.source is not None and cmdargs.name is not None and
+            len(cmdargs.source) != len(cmdargs.name)):
+        msg = "Must specify a --name for each --source"
+        raise SystemExit(msg)
+
     if cmdargs.printct is not None and any(writeValid):
         msg = "can't specify --name, --source or --dest with --print"
         raise SystemExit(msg)
@@ -97,10 +112,10 @@ def printTables(fname):
     del ds
 
 
-def addTable(source, name, dest):
+def readSourceLUT(source, nodata_rgba, nan_rgba):
     """
-    Insert color table from source as a surrogate
-    color table into dest, naming it name
+    Read the RAT of the first band of source and 
+    turn the color table in it into a LUT
     """
     sourceds = gdal.Open(source)
     if sourceds is None:
@@ -112,50 +127,90 @@ def addTable(source, name, dest):
     rat = ViewerRAT()
     rat.readFromGDALBand(sourceband, sourceds)
 
+    lutobj = ViewerLUT()
+    lut, _ = lutobj.loadColorTable(rat, nodata_rgba, nodata_rgba, nan_rgba)
+    del sourceds
+    return lut
+
+
+def addTables(dest, tableList):
+    """
+    Insert color tables into dest as surrogate color tables.
+    tableList is a list of (source, name) tuples. The color table
+    is read from each source and saved under the corresponding name.
+    dest is only opened and updated once.
+    """
     # should we allow this to be set?
     nodata_rgba = (0, 0, 0, 0)
     nan_rgba = (0, 0, 0, 0)
-    lutobj = ViewerLUT()
-    lut, _ = lutobj.loadColorTable(rat, nodata_rgba, nodata_rgba, nan_rgba)
+
+    luts = []
+    for source, name in tableList:
+        # reuse the lut if this source has already been read
+        # and hasn't changed since
+        try:
+            key = (source, os.path.getmtime(source))
+        except OSError:
+            # not a normal file (/vsi path etc) - don't cache
+            key = None
+
+        lut = LUT_CACHE.get(key) if key is not None else None
+        if lut is None:
+            lut = readSourceLUT(source, nodata_rgba, nan_rgba)
+            if key is not None:
+                LUT_CACHE[key] = lut
+
+        luts.append((name, lut))
 
     destds = gdal.Open(dest, gdal.GA_Update)
     if destds is None:
         msg = "Cannot open %s for writing" % dest
         raise SystemExit(msg)
 
-    # read in existing tables (if any)
-    tables = ViewerLUT.readSurrogateColorTables(destds)
-
-    # what to do if already exists? Dunno.
-    tables[name] = lut[:-2]  # strip off the nodata and background
+    tables = {}
+    for name, lut in luts:
+        # what to do if already exists? Dunno.
+        tables[name] = lut[:-2]  # strip off the nodata and background
 
-    # write out
-    ViewerLUT.writeSurrogateColorTables(destds, tables)
+    # write out, leaving any existing tables as they are
+    ViewerLUT.upsertSurrogateColorTables(destds, tables)
 
-    del sourceds
     del destds
 
 
-def removeTable(fname, tablename):
+def addTable(source, name, dest):
+    """
+    Insert color table from source as a surrogate
+    color table into dest, naming it name
+    """
+    addTables(dest, [(source, name)])
 
+
+def removeTables(fname, tablenames):
+    """
+    Remove the named surrogate color tables from fname.
+    fname is only opened and updated once.
+    """
     destds = gdal.Open(fname, gdal.GA_Update)
     if destds is None:
         msg = "Cannot open %s for writing" % fname
         raise SystemExit(msg)
 
-    # read in existing tables (if any)
-    tables = ViewerLUT.readSurrogateColorTables(destds)
-
-    if tablename not in tables:
-        msg = "Can't find table %s in %s" % (tablename, fname)
-        raise SystemExit(msg)
+    # the other tables are written back without being decoded
+    try:
+        ViewerLUT.removeSurrogateColorTables(destds, tablenames)
+    except InvalidColorTable as e:
+        msg = "%s in %s" % (e, fname)
+        raise SystemExit(msg) from e
 
-    del tables[tablename]
+    del destds
 
-    # write out
-    ViewerLUT.writeSurrogateColorTables(destds, tables)
 
-    del destds
+def removeTable(fname, tablename):
+    """
+    Remove the named surrogate color table from fname
+    """
+    removeTables(fname, [tablename])
 
 
 def run():
@@ -164,11 +219,16 @@ def run():
     and the appropriate function called.
     """
     cmdargs = getCmdargs()
+
+    # We only need to read and write metadata, so stop GDAL reading the 
+    # whole directory on each open (slow on network filesystems).
+    # Not EMPTY_DIR, as we still need GDAL to find any .aux.xml file.
+    gdal.SetConfigOption('GDAL_DISABLE_READDIR_ON_OPEN', 'TRUE')
     
     if cmdargs.printct is not None:
         printTables(cmdargs.printct)
     elif cmdargs.remove is not None:
-        removeTable(cmdargs.remove, cmdargs.name)
+        removeTables(cmdargs.remove, cmdargs.name)
     else:
-        addTable(cmdargs.source, cmdargs.name, cmdargs.dest)
+        addTables(cmdargs.dest, list(zip(cmdargs.source, cmdargs.name)))
 